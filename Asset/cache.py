@@ -0,0 +1,285 @@
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from Asset.progress import final_paths
+
+try:
+    import fcntl
+except ImportError:  # Windows: the index is still written atomically, just not locked
+    fcntl = None
+
+# Parameters that change how an operation runs but not what it produces
+NON_OUTPUT_PARAMS = ('workers', 'chunksize')
+
+HASH_MEMO_LIMIT = 100000
+
+
+def cache_enabled():
+    return os.environ.get('TASKMASTER_CACHE', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def enable_cache(enabled=True):
+    """Turn the result cache on or off for this process and any workers it starts."""
+    os.environ['TASKMASTER_CACHE'] = '1' if enabled else '0'
+
+
+class ResultCache:
+    """
+    Content-addressed store of handler outputs under Output/.cache.
+
+    Entries are keyed on the SHA-256 of the input file (or every file of an input folder),
+    the input's name (outputs are named after it), the operation name and its parameters. Output files live in objects/<key>/ and are
+    copied into the output folder on a hit, never linked, so editing an output in place
+    cannot change the cached object. The least recently used entries are evicted once
+    the store exceeds max_bytes or max_entries. File hashes are memoised in a separate
+    SQLite database keyed on path, size and mtime, so the index stays small.
+    """
+
+    def __init__(self, root=None, max_bytes=None, max_entries=None):
+        self.root = Path(root or os.environ.get('TASKMASTER_CACHE_DIR', 'Output/.cache'))
+        self.max_bytes = max_bytes or int(os.environ.get('TASKMASTER_CACHE_MAX_MB', 2048)) * 1024 * 1024
+        self.max_entries = max_entries or int(os.environ.get('TASKMASTER_CACHE_MAX_ENTRIES', 10000))
+        self.objects = self.root / 'objects'
+        self.staging = self.root / 'staging'
+        self.index_path = self.root / 'index.json'
+        self.hashes_path = self.root / 'hashes.sqlite'
+        self.hits = 0
+        self.misses = 0
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.staging.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _locked_index(self):
+        """Load the index under an exclusive lock; write it back atomically if it changed."""
+        with open(self.root / 'index.lock', 'w') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                index = self._read_index()
+                original = json.dumps(index, sort_keys=True)
+                yield index
+                if json.dumps(index, sort_keys=True) != original:
+                    fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.json')
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(index, f)
+                    os.replace(temp_path, self.index_path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'entries': {}}
+        index.pop('hashes', None)  # memo of older versions, now in hashes.sqlite
+        return index
+
+    def _open_hashes(self):
+        # A connection per call: the cache object may be inherited by forked pool workers
+        connection = sqlite3.connect(self.hashes_path, timeout=60)
+        connection.execute('CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, '
+                           'mtime_ns INTEGER, sha256 TEXT, updated REAL)')
+        return connection
+
+    def file_digest(self, path, connection, updates):
+        """SHA-256 of a file, reusing the memoised value while size and mtime are unchanged."""
+        stat = os.stat(path)
+        memo_key = os.path.abspath(path)
+        known = connection.execute('SELECT size, mtime_ns, sha256 FROM hashes WHERE path = ?',
+                                   (memo_key,)).fetchone()
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        updates.append((memo_key, stat.st_size, stat.st_mtime_ns, digest.hexdigest(), time.time()))
+        return digest.hexdigest()
+
+    def make_key(self, operation, input_path, params):
+        updates = []
+        connection = self._open_hashes()
+        try:
+            if os.path.isdir(input_path):
+                digest = hashlib.sha256()
+                for root, dirs, files in os.walk(input_path):
+                    dirs.sort()
+                    for name in sorted(files):
+                        path = os.path.join(root, name)
+                        digest.update(os.path.relpath(path, input_path).encode())
+                        digest.update(self.file_digest(path, connection, updates).encode())
+                content = digest.hexdigest()
+            else:
+                content = self.file_digest(input_path, connection, updates)
+
+            # Only newly hashed files are written; the oldest memo rows go past HASH_MEMO_LIMIT
+            if updates:
+                with connection:
+                    connection.executemany('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)', updates)
+                    connection.execute('DELETE FROM hashes WHERE path IN (SELECT path FROM hashes ORDER BY updated '
+                                       'LIMIT max(0, (SELECT count(*) FROM hashes) - ?))', (HASH_MEMO_LIMIT,))
+        finally:
+            connection.close()
+
+        name = os.path.basename(os.path.normpath(input_path))
+        payload = json.dumps([operation, name, content, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def lookup(self, key, output_folder):
+        """
+        Copy the cached files for key into output_folder and return the entry, or None.
+
+        The copy happens under the index lock, so no concurrent store or eviction can
+        replace or delete the object directory halfway through.
+        """
+        with self._locked_index() as index:
+            entry = index['entries'].get(key)
+            if entry is None or not (self.objects / key).is_dir():
+                index['entries'].pop(key, None)
+                return None
+            _copy_files(self.objects / key, entry['files'], output_folder)
+            entry['last_used'] = time.time()
+            return entry
+
+    def store(self, key, operation, staging_dir, output_folder, result):
+        """Copy freshly produced files into output_folder, then move them into the cache."""
+        staging_dir = Path(staging_dir)
+        files, size = [], 0
+        for path in sorted(staging_dir.rglob('*')):
+            if path.is_file():
+                files.append(path.relative_to(staging_dir).as_posix())
+                size += path.stat().st_size
+        _copy_files(staging_dir, files, output_folder)
+
+        object_dir = self.objects / key
+        replaced = None
+        with self._locked_index() as index:
+            # Staging is on the same filesystem, so both renames are atomic
+            if object_dir.exists():
+                replaced = Path(tempfile.mkdtemp(dir=self.staging))
+                os.replace(object_dir, replaced)
+            os.replace(staging_dir, object_dir)
+            index['entries'][key] = {
+                'operation': operation,
+                'files': files,
+                'size': size,
+                'result': result,
+                'created': time.time(),
+                'last_used': time.time(),
+            }
+            self._evict(index)
+        if replaced is not None:
+            shutil.rmtree(replaced, ignore_errors=True)
+
+    def _evict(self, index):
+        entries = index['entries']
+        total = sum(entry['size'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= self.max_bytes and len(entries) <= self.max_entries:
+                break
+            total -= entries.pop(key)['size']
+            shutil.rmtree(self.objects / key, ignore_errors=True)
+            logging.info(f"Cache evicted {key[:12]}")
+
+    def log_stats(self, operation, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        logging.info(f"Cache {'hit' if hit else 'miss'} for {operation} "
+                     f"(hits={self.hits}, misses={self.misses})")
+
+
+def _copy_files(source_dir, files, output_folder):
+    for relative in files:
+        _copy_into_place(Path(source_dir) / relative, Path(output_folder) / relative)
+
+
+def _copy_into_place(source, target):
+    """Copy source to target through a temporary file, so target is replaced atomically."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    os.close(fd)
+    try:
+        shutil.copy2(source, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+_cache = None
+
+
+def get_cache():
+    """The process-wide ResultCache, or None while caching is disabled."""
+    global _cache
+    if not cache_enabled():
+        return None
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
+
+
+def cached(operation, ignore=NON_OUTPUT_PARAMS):
+    """
+    Serve a handler method from the result cache when its input and parameters repeat.
+
+    The method's first parameter is the input file or folder and it must take an
+    output_folder keyword. On a miss the method runs against a private staging folder,
+    so exactly the files it produced are copied into place and then cached.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        input_name = next(iter(signature.parameters))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {name: value for name, value in bound.arguments.items()
+                      if name not in (input_name, 'output_folder') and name not in ignore}
+            output_folder = bound.arguments['output_folder']
+            key = cache.make_key(operation, bound.arguments[input_name], params)
+
+            entry = cache.lookup(key, output_folder)
+            if entry is not None:
+                cache.log_stats(operation, hit=True)
+                return entry['result']
+
+            cache.log_stats(operation, hit=False)
+            staging_dir = tempfile.mkdtemp(dir=cache.staging)
+            try:
+                bound.arguments['output_folder'] = staging_dir
+                with final_paths(staging_dir, output_folder):
+                    result = func(*bound.args, **bound.kwargs)
+                if result is not False:
+                    cache.store(key, operation, staging_dir, output_folder, result)
+                else:
+                    # Nothing worth caching, but keep whatever the method did write
+                    for path in Path(staging_dir).rglob('*'):
+                        if path.is_file():
+                            _copy_into_place(path, Path(output_folder) / path.relative_to(staging_dir))
+                return result
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+        return wrapper
+    return decorator
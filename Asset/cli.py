@@ -0,0 +1,401 @@
+import argparse
+import asyncio
+import glob
+import importlib
+import inspect
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from Asset.cache import enable_cache
+from Asset.metrics import enable_metrics
+from Asset.progress import PROGRESS_MODES, failures, set_progress_mode
+from Asset.watch import INCREMENTAL_OPERATIONS, FolderWatcher
+from Asset.utils import configure_logging
+
+# Handlers are named rather than imported so that start-up only pays for the subsystem in use
+HANDLERS = {
+    'pdf': 'Asset.pdf_handler.PDFHandler',
+    'image': 'Asset.image_handler.ImageHandler',
+    'excel': 'Asset.excel_tool.ExcelTool',
+}
+
+
+def handler_class(group):
+    """Import and return the handler class for a group on first use."""
+    module_name, class_name = HANDLERS[group].rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def _parse_size(value):
+    """argparse type for WIDTHxHEIGHT values."""
+    try:
+        width, height = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {value!r}")
+    return width, height
+
+
+# Input selection shared by the folder operations; see Asset.discovery.discover
+FILTER_OPTIONS = (
+    (('--include',), {'action': 'append', 'metavar': 'GLOB',
+                      'help': 'Only take files matching this glob (name, or relative path if it has a /); repeatable'}),
+    (('--exclude',), {'action': 'append', 'metavar': 'GLOB',
+                      'help': 'Skip files and folders matching this glob; repeatable'}),
+)
+DISCOVERY_OPTIONS = (
+    (('--recursive', '-r'), {'action': 'store_true', 'help': 'Also take files from subfolders'}),
+) + FILTER_OPTIONS
+
+
+# group -> command -> (method name, input kind, accepted extensions, extra options)
+# Each extra option is (flags, argparse kwargs); its dest must match the handler keyword.
+OPERATIONS = {
+    'pdf': {
+        'split': ('split', 'file', ('.pdf',), (
+            (('--pages-per-file',), {'type': int, 'default': 1, 'help': 'Pages per output file (default: 1)'}),
+            (('--ranges',), {'help': 'Explicit page ranges such as "1-3,5,8-"'}),
+            (('--workers',), {'type': int, 'help': 'Split processes per PDF (default: all CPUs)'}),
+        )),
+        'merge': ('merge', 'folder', None, DISCOVERY_OPTIONS + (
+            (('--batch-size',), {'type': int, 'help': 'Merge through intermediate files, opening at most this many PDFs at once'}),
+        )),
+        'remove-blank': ('remove_blank', 'file', ('.pdf',), (
+            (('--ink-threshold',), {'type': float, 'default': 0.005,
+                                    'help': 'Max share of dark pixels for a page to count as blank (default: 0.005)'}),
+            (('--white-level',), {'type': int, 'default': 220,
+                                  'help': 'Gray level (0-255) below which a pixel counts as ink (default: 220)'}),
+            (('--workers',), {'type': int, 'help': 'Processes checking pages (default: all CPUs)'}),
+        )),
+        'compress': ('compress_pdf', 'file', ('.pdf',), (
+            (('--target-dpi',), {'type': int, 'default': 150, 'help': 'Downsample images above this DPI (default: 150)'}),
+            (('--jpeg-quality',), {'type': int, 'default': 80, 'help': 'JPEG quality for re-encoded images (default: 80)'}),
+            (('--lossless',), {'dest': 'jpeg_quality', 'action': 'store_const', 'const': None,
+                               'help': 'Only recompress streams; leave images untouched'}),
+            (('--workers',), {'type': int, 'help': 'Image recompression processes (default: all CPUs)'}),
+        )),
+        'images-to-pdf': ('images_to_pdf', 'folder', None, DISCOVERY_OPTIONS),
+    },
+    'image': {
+        'extract-exif': ('extract_data', 'file', IMAGE_EXTENSIONS, ()),
+        'extract-exif-batch': ('extract_data_batch', 'folder', None, FILTER_OPTIONS + (
+            (('--format',), {'dest': 'output_format', 'choices': ('csv', 'jsonl', 'parquet'), 'default': 'csv',
+                             'help': 'Output table format (default: csv)'}),
+            (('--workers',), {'type': int, 'help': 'Processes reading headers (default: all CPUs)'}),
+        )),
+        'remove-exif': ('remove_exif_data', 'file', IMAGE_EXTENSIONS, ()),
+        'remove-exif-batch': ('remove_exif_folder', 'folder', None, DISCOVERY_OPTIONS + (
+            (('--workers',), {'type': int, 'help': 'Processes stripping metadata (default: all CPUs)'}),
+        )),
+        'compress': ('compress_image', 'file', IMAGE_EXTENSIONS, (
+            (('--quality',), {'type': int, 'default': 85, 'help': 'JPEG quality (default: 85)'}),
+        )),
+        'convert': ('convert_format', 'file', IMAGE_EXTENSIONS, (
+            (('--format',), {'dest': 'target_format', 'default': 'PNG', 'help': 'Target format (default: PNG)'}),
+        )),
+        'resize': ('resize_image', 'file', IMAGE_EXTENSIONS, (
+            (('--width',), {'type': int, 'help': 'Target width in pixels'}),
+            (('--height',), {'type': int, 'help': 'Target height in pixels'}),
+        )),
+        'thumbnails': ('make_thumbnails', 'file', IMAGE_EXTENSIONS, (
+            (('--size',), {'dest': 'sizes', 'type': _parse_size, 'action': 'append',
+                           'help': 'Thumbnail box as WIDTHxHEIGHT; repeat for several sizes'}),
+        )),
+        'thumbnails-batch': ('batch_thumbnails', 'folder', None, DISCOVERY_OPTIONS + (
+            (('--size',), {'dest': 'sizes', 'type': _parse_size, 'action': 'append',
+                           'help': 'Thumbnail box as WIDTHxHEIGHT; repeat for several sizes'}),
+            (('--workers',), {'type': int, 'help': 'Thumbnail processes (default: all CPUs)'}),
+        )),
+        'batch-convert': ('batch_convert_format', 'folder', None, DISCOVERY_OPTIONS + (
+            (('--format',), {'dest': 'output_format', 'choices': ('jpeg', 'jpg', 'png'), 'required': True,
+                             'help': 'Output format'}),
+            (('--workers',), {'type': int, 'help': 'Conversion processes per folder (default: all CPUs)'}),
+        )),
+        'images-to-pdf': ('images_to_pdf_with_filenames', 'folder', None, DISCOVERY_OPTIONS + (
+            (('--name',), {'dest': 'output_pdf', 'default': 'output.pdf', 'help': 'Output PDF name'}),
+        )),
+    },
+    'excel': {
+        'merge-workbook': ('merge_workbook', 'folder', None, DISCOVERY_OPTIONS + (
+            (('--workers',), {'type': int, 'help': 'Processes parsing input files (default: all CPUs)'}),
+        )),
+        'merge-worksheet': ('merge_worksheet', 'folder', None, DISCOVERY_OPTIONS + (
+            (('--streaming',), {'action': 'store_true', 'help': 'Merge in chunks with constant memory'}),
+            (('--chunksize',), {'type': int, 'default': 50000, 'help': 'Rows per CSV chunk in streaming mode'}),
+            (('--format',), {'dest': 'output_format', 'choices': ('xlsx', 'csv'), 'default': 'xlsx',
+                             'help': 'Output format in streaming mode (default: xlsx)'}),
+            (('--workers',), {'type': int, 'help': 'Processes parsing input files (default: all CPUs)'}),
+        )),
+        'to-csv': ('excel_to_csv', 'file', ('.xlsx',), (
+            (('--format',), {'dest': 'output_format', 'choices': ('csv', 'csv.gz', 'parquet'), 'default': 'csv',
+                             'help': 'Output format per sheet (default: csv)'}),
+            (('--workers',), {'type': int, 'help': 'Processes exporting sheets (default: all CPUs)'}),
+        )),
+        'from-csv': ('csv_to_excel', 'file', ('.csv',), (
+            (('--large-file',), {'action': 'store_true', 'help': 'Chunked read and constant-memory write'}),
+            (('--chunksize',), {'type': int, 'default': 100000, 'help': 'Rows per chunk in large-file mode'}),
+        )),
+        'format': ('format_excel', 'file', ('.xlsx',), (
+            (('--streaming',), {'action': 'store_true', 'help': 'Bounded-memory read-only/write-only rewrite'}),
+            (('--sample-rows',), {'type': int, 'help': 'Measure column widths on the first N rows only'}),
+        )),
+    },
+}
+
+
+def build_parser():
+    """Build the `taskmaster <group> <command>` argument parser."""
+    parser = argparse.ArgumentParser(
+        prog='taskmaster',
+        description='Run TaskMaster operations without the interactive menu.'
+    )
+    parser.add_argument('--excel-engine', choices=('auto', 'calamine', 'openpyxl'),
+                        help='Workbook reader: calamine is faster, openpyxl is the fallback (default: auto)')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse earlier outputs when the input content and options are unchanged')
+    parser.add_argument('--progress', choices=PROGRESS_MODES,
+                        help='Progress display (default: tqdm on a terminal, throughput lines otherwise)')
+    parser.add_argument('--metrics', action='store_true',
+                        help='Record per-operation metrics as JSON lines in Output/metrics.jsonl')
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help='Also keep a Prometheus textfile of metric totals at PATH (implies --metrics)')
+    groups = parser.add_subparsers(dest='group', required=True)
+
+    for group, commands in OPERATIONS.items():
+        group_parser = groups.add_parser(group, help=f'{group.upper()} tools')
+        command_parsers = group_parser.add_subparsers(dest='command', required=True)
+
+        for command, (_, kind, extensions, options) in commands.items():
+            command_parser = command_parsers.add_parser(command)
+            what = 'folders' if kind == 'folder' else 'files'
+            command_parser.add_argument('inputs', nargs='+', metavar='INPUT',
+                                        help=f'Input {what} or glob patterns (quote them to use ** recursion)')
+            command_parser.add_argument('-o', '--output-dir', dest='output_folder',
+                                        help='Output directory (default: the handler\'s folder under Output/)')
+            command_parser.add_argument('-j', '--jobs', type=int, default=1,
+                                        help='Number of inputs processed concurrently (default: 1)')
+            for flags, kwargs in options:
+                command_parser.add_argument(*flags, **kwargs)
+
+    watch_parser = groups.add_parser('watch', help='Keep a folder operation up to date as files arrive')
+    watch_parser.add_argument('operation', choices=sorted(INCREMENTAL_OPERATIONS))
+    watch_parser.add_argument('folder', help='Folder to watch')
+    watch_parser.add_argument('-o', '--output-dir', dest='output_folder',
+                              help='Output directory (default: a folder of its own under Output/Watch/)')
+    watch_parser.add_argument('--interval', type=float, default=5.0,
+                              help='Polling interval in seconds when inotify is unavailable (default: 5)')
+    watch_parser.add_argument('--once', action='store_true', help='Process the current delta and exit')
+    watch_parser.add_argument('--format', dest='output_format', choices=('jpeg', 'jpg', 'png'), default='png',
+                              help='Output format for image-batch-convert (default: png)')
+
+    jobs_parser = groups.add_parser('jobs', help='Run a JSON file of jobs through the priority scheduler')
+    jobs_parser.add_argument('jobs_file', help='JSON list of {"group", "command", "input", "priority", "options"}')
+    for group in OPERATIONS:
+        jobs_parser.add_argument(f'--{group}-workers', type=int,
+                                 help=f'Processes for {group} jobs (default: based on CPU count)')
+    jobs_parser.add_argument('--report', help='Write job states and timings to this JSON file')
+
+    serve_parser = groups.add_parser('serve', help='Run a local HTTP server with warm worker pools')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='Address to bind (default: 127.0.0.1)')
+    serve_parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    serve_parser.add_argument('--max-pending', type=int,
+                              help='Concurrent requests before answering 503 (default: twice the pool slots)')
+    for group in OPERATIONS:
+        serve_parser.add_argument(f'--{group}-workers', type=int,
+                                  help=f'Warm processes for {group} requests (default: based on CPU count)')
+
+    return parser
+
+
+def expand_inputs(patterns, kind, extensions=None):
+    """Expand glob patterns into an ordered, de-duplicated list of matching paths."""
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for match in matches:
+            if kind == 'folder' and not os.path.isdir(match):
+                continue
+            if kind == 'file':
+                if not os.path.isfile(match):
+                    continue
+                if extensions and not match.lower().endswith(extensions):
+                    continue
+            if match not in seen:
+                seen.add(match)
+                paths.append(match)
+    return paths
+
+
+def output_folders(group, command, inputs, output_folder=None):
+    """
+    The output folder for each input, so that inputs of one command never overwrite each other.
+
+    Handlers write fixed names (merged.pdf, <stem>_page_1.pdf, ...). A lone input, or file
+    inputs whose stems all differ, write to output_folder; otherwise every input gets its
+    own subfolder named after it, numbered when names repeat. None means the handler default.
+    """
+    kind = OPERATIONS[group][command][1]
+    names = [Path(path).stem if kind == 'file' else Path(os.path.abspath(path)).name for path in inputs]
+    if len(inputs) < 2 or (kind == 'file' and len({name.casefold() for name in names}) == len(names)):
+        return [output_folder] * len(inputs)
+
+    if output_folder is None:
+        method = getattr(handler_class(group), OPERATIONS[group][command][0])
+        output_folder = inspect.signature(method).parameters['output_folder'].default
+    folders, used = [], set()
+    for name in names:
+        candidate, number = name or 'input', 1
+        while candidate.casefold() in used:
+            number += 1
+            candidate = f"{name or 'input'}_{number}"
+        used.add(candidate.casefold())
+        folders.append(str(Path(output_folder) / candidate))
+    return folders
+
+
+def handler_options(args):
+    """Handler keyword arguments from a parsed operation command line."""
+    options = {}
+    if args.output_folder:
+        options['output_folder'] = args.output_folder
+    for flags, kwargs in OPERATIONS[args.group][args.command][3]:
+        dest = kwargs.get('dest', flags[0].lstrip('-').replace('-', '_'))
+        # Unset options without a default fall back to the handler's own default
+        if getattr(args, dest) is not None or 'default' in kwargs:
+            options[dest] = getattr(args, dest)
+    return options
+
+
+def pooled_options(group, command, options, workers=1):
+    """
+    options for one job of a process pool: handlers that start their own pool get
+    `workers` processes (unless the job sets workers), not one per CPU in every slot.
+    """
+    if 'workers' in options or not any('--workers' in flags for flags, _ in OPERATIONS[group][command][3]):
+        return options
+    return dict(options, workers=workers)
+
+
+def run_job(group, command, input_path, options):
+    """
+    Run one handler operation; returns (input_path, error message or None, seconds).
+
+    Handlers report failure by raising, by returning False or by naming inputs they could
+    not process through progress.fail(); all three count as an error.
+    """
+    method = getattr(handler_class(group), OPERATIONS[group][command][0])
+    start = time.perf_counter()
+    try:
+        with failures() as failed:
+            result = method(input_path, **options)
+        if failed:
+            shown = ', '.join(os.path.basename(name) for name in failed[:5])
+            error = f"{len(failed)} input(s) failed: {shown}{', ...' if len(failed) > 5 else ''}"
+        elif not result:
+            error = "operation reported failure (see Output/log.log)"
+        else:
+            error = None
+    except Exception as e:
+        error = str(e)
+    return input_path, error, time.perf_counter() - start
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging('Output')
+    if args.cache:
+        enable_cache()
+    if args.progress:
+        set_progress_mode(args.progress)
+    if args.metrics or args.metrics_prom:
+        enable_metrics(prometheus_path=args.metrics_prom)
+    if args.excel_engine:
+        handler_class('excel').set_reader_engine(args.excel_engine)
+
+    if args.group == 'watch':
+        watcher = FolderWatcher(args.folder, args.operation, args.output_folder, args.interval,
+                                output_format=args.output_format)
+        watcher.run(max_cycles=1 if args.once else None)
+        return 0
+
+    if args.group == 'jobs':
+        return _run_jobs_file(args)
+    if args.group == 'serve':
+        from Asset.server import serve  # the server imports this module
+        serve(args.host, args.port, _pool_sizes(args), args.max_pending)
+        return 0
+
+    _, kind, extensions, _ = OPERATIONS[args.group][args.command]
+    options = handler_options(args)
+    inputs = expand_inputs(args.inputs, kind, extensions)
+    if not inputs:
+        print(f"No matching input {kind}s found.")
+        return 2
+
+    logging.info(f"CLI {args.group} {args.command}: {len(inputs)} input(s), {args.jobs} job(s)")
+    folders = output_folders(args.group, args.command, inputs, options.get('output_folder'))
+    job_options = [dict(options, output_folder=folder) if folder else options for folder in folders]
+    failures = 0
+
+    if args.jobs > 1 and len(inputs) > 1:
+        share = max(1, (os.cpu_count() or 1) // args.jobs)
+        with ProcessPoolExecutor(max_workers=args.jobs, initializer=configure_logging,
+                                 initargs=('Output',)) as executor:
+            futures = [executor.submit(run_job, args.group, args.command, path,
+                                       pooled_options(args.group, args.command, path_options, share))
+                       for path, path_options in zip(inputs, job_options)]
+            results = (future.result() for future in as_completed(futures))
+            failures = _report(results)
+    else:
+        results = (run_job(args.group, args.command, path, path_options)
+                   for path, path_options in zip(inputs, job_options))
+        failures = _report(results)
+
+    logging.info(f"CLI {args.group} {args.command} finished: {len(inputs) - failures} ok, {failures} failed")
+    return 1 if failures else 0
+
+
+def _pool_sizes(args):
+    """Per-handler pool sizes given with --<group>-workers."""
+    return {group: getattr(args, f'{group}_workers') for group in OPERATIONS
+            if getattr(args, f'{group}_workers')}
+
+
+def _run_jobs_file(args):
+    from Asset.scheduler import JobScheduler, load_jobs  # the scheduler imports this module
+
+    scheduler = JobScheduler(_pool_sizes(args))
+    load_jobs(args.jobs_file, scheduler)
+    if not scheduler.jobs:
+        print("No jobs to run.")
+        return 2
+
+    jobs = asyncio.run(scheduler.run())
+    failures = _report((job.input_path, job.error, job.run_time) for job in jobs)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump([job.to_dict() for job in jobs], f, indent=2)
+    logging.info(f"Jobs finished: {scheduler.summary()}")
+    return 1 if failures else 0
+
+
+def _report(results):
+    failures = 0
+    for input_path, error, elapsed in results:
+        if error is None:
+            print(f"OK      {input_path} ({elapsed:.2f}s)")
+        else:
+            failures += 1
+            logging.error(f"CLI job failed for {input_path}: {error}")
+            print(f"FAILED  {input_path}: {error}")
+    return failures
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+import fnmatch
+import logging
+import os
+import re
+from pathlib import Path
+
+_DIGITS = re.compile(r'(\d+)')
+
+
+def natural_key(name):
+    """Sort key that orders 'page2' before 'page10' and ignores case."""
+    parts = _DIGITS.split(name)
+    # split() alternates text and digit runs, so the ints always compare against ints
+    return tuple(int(part) if index % 2 else part.casefold() for index, part in enumerate(parts)), name
+
+
+def normalize_extensions(extensions):
+    """Lower-case tuple of extensions with a leading dot, or None for any extension."""
+    if not extensions:
+        return None
+    if isinstance(extensions, str):
+        extensions = (extensions,)
+    return tuple(ext.lower() if ext.startswith('.') else f".{ext.lower()}" for ext in extensions)
+
+
+def _compile_globs(patterns):
+    """Case-insensitive matchers for glob patterns; patterns with a '/' match the relative path."""
+    if isinstance(patterns, str):
+        patterns = (patterns,)
+    return [('/' in pattern, re.compile(fnmatch.translate(pattern), re.IGNORECASE)) for pattern in patterns or ()]
+
+
+def _matches(globs, relative, name):
+    return any(regex.match(relative if on_path else name) for on_path, regex in globs)
+
+
+def _list_dir(path, sort):
+    with os.scandir(path) as entries:
+        entries = list(entries)
+    if sort:
+        entries.sort(key=lambda entry: natural_key(entry.name))
+    return entries
+
+
+def discover(root, extensions=None, recursive=False, include=None, exclude=None, folders=False,
+             hidden=False, sort=True, follow_symlinks=False):
+    """
+    Yield os.DirEntry objects for the files (or, with folders=True, folders) under root.
+
+    Extensions match case-insensitively, so '.pdf' also finds REPORT.PDF. include and
+    exclude are fnmatch patterns (where * also matches '/') compared, ignoring case, with
+    the entry name or, when the pattern contains '/', with its path relative to root;
+    excluded folders are not descended into. Names starting with '.' are skipped unless
+    hidden=True. Entries come in natural order per folder, depth first, and are produced
+    while the tree is walked, so only one folder listing per level is held in memory.
+    Symlinked folders are skipped unless follow_symlinks=True (with recursive, a link
+    cycle is then walked until the path gets too long). An unreadable root raises;
+    unreadable subfolders are logged and skipped.
+    """
+    extensions = normalize_extensions(extensions)
+    include = _compile_globs(include)
+    exclude = _compile_globs(exclude)
+    prefix = os.path.join(os.fspath(root), '')
+
+    stack = [iter(_list_dir(root, sort))]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        if not hidden and entry.name.startswith('.'):
+            continue
+
+        relative = entry.path[len(prefix):].replace(os.sep, '/')
+        if exclude and _matches(exclude, relative, entry.name):
+            continue
+
+        try:
+            is_folder = entry.is_dir(follow_symlinks=follow_symlinks)
+            if not is_folder and not entry.is_file():
+                continue
+        except OSError:
+            continue
+
+        if is_folder:
+            if folders and (not include or _matches(include, relative, entry.name)):
+                yield entry
+            if recursive:
+                try:
+                    stack.append(iter(_list_dir(entry.path, sort)))
+                except OSError as e:
+                    logging.warning(f"Skipping unreadable folder {entry.path}: {e}")
+        elif not folders:
+            if extensions and not entry.name.lower().endswith(extensions):
+                continue
+            if include and not _matches(include, relative, entry.name):
+                continue
+            yield entry
+
+
+def discover_names(root, extensions=None, recursive=False, include=None, exclude=None, **kwargs):
+    """Like discover, but yield paths relative to root with '/' separators."""
+    prefix = os.path.join(os.fspath(root), '')
+    for entry in discover(root, extensions, recursive, include, exclude, **kwargs):
+        yield entry.path[len(prefix):].replace(os.sep, '/')
+
+
+def mirror_folder(output_folder, relative_name):
+    """The folder under output_folder that mirrors relative_name's folder, created if needed."""
+    parent = Path(output_folder) / Path(relative_name).parent
+    if parent != Path(output_folder):
+        parent.mkdir(parents=True, exist_ok=True)
+    return parent
@@ -1,11 +1,59 @@
+import csv
+import datetime
+import gzip
+import importlib.util
+import itertools
 import os
+import pickle
+import re
+import tempfile
+import time
 import pandas as pd
 from pathlib import Path
 import logging
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Font
+from openpyxl.utils import get_column_letter
+import xlsxwriter
+from Asset import progress
+from Asset.cache import cached
+from Asset.discovery import discover_names
+from Asset.metrics import add_items, instrumented, phase
+from Asset.progress import OperationCancelled, tracked
+from Asset.utils import bounded_map, parallel_map
+
+READER_ENGINES = ('calamine', 'openpyxl')
+
+
+def reader_engine():
+    """
+    The pandas engine used to read workbooks.
+
+    TASKMASTER_EXCEL_ENGINE (set through ExcelTool.set_reader_engine) picks one explicitly;
+    otherwise the Rust-based calamine reader is used when python-calamine is installed,
+    falling back to openpyxl.
+    """
+    engine = os.environ.get('TASKMASTER_EXCEL_ENGINE', 'auto')
+    if engine == 'auto':
+        return 'calamine' if importlib.util.find_spec('python_calamine') else 'openpyxl'
+    return engine
+
+
+def _read_excel(file_path, **kwargs):
+    return pd.read_excel(file_path, engine=reader_engine(), **kwargs)
+
 
 class ExcelTool:
+    @staticmethod
+    def set_reader_engine(engine):
+        """Select the workbook reader ('calamine', 'openpyxl' or 'auto') for this and child processes."""
+        if engine != 'auto' and engine not in READER_ENGINES:
+            raise ValueError(f"Unknown Excel reader engine: {engine}")
+        # The environment carries the choice into worker processes, including spawned ones
+        os.environ['TASKMASTER_EXCEL_ENGINE'] = engine
+        logging.info(f"Excel reader engine set to {reader_engine()}")
+
     @staticmethod
     def main_menu(folder_path=None):
         """Main menu for merging Excel files with two options."""
@@ -36,153 +84,662 @@ class ExcelTool:
                 print("Invalid choice. Please enter a valid option.")
 
     @staticmethod
-    def merge_workbook(folder_path):
+    @tracked('Merging workbooks')
+    @instrumented('excel.merge_workbook')
+    @cached('excel.merge_workbook')
+    def merge_workbook(folder_path, output_folder='Output', workers=None, recursive=False, include=None, exclude=None):
+        """
+        Merge every CSV/XLSX in folder_path into one workbook with a sheet per file.
+
+        Files are taken in natural name order; recursive, include and exclude select them
+        as in Asset.discovery.discover.
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             output_path = output_folder / "merged_workbook.xlsx"
 
+            file_names = list(discover_names(folder_path, ('.xlsx', '.csv'), recursive, include, exclude))
+
+            progress.start(len(file_names), 'files')
+            used_names = set()
             with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
-                for idx, file_name in enumerate(sorted(os.listdir(folder_path))):
-                    if file_name.endswith(('.xlsx', '.csv')):
-                        file_path = Path(folder_path) / file_name
-                        sheet_name = file_name[:31] if len(file_name) > 31 else file_name
-                        
-                        df = pd.read_csv(file_path) if file_name.endswith('.csv') else pd.read_excel(file_path)
-                        df['Source File'] = file_name
+                for file_name, df in _load_frames(folder_path, file_names, workers):
+                    sheet_name = unique_sheet_name(file_name, used_names)
+                    with phase('write'):
                         df.to_excel(writer, sheet_name=sheet_name, index=False)
-                        
-                        logging.info(f"Added {file_name} as sheet {sheet_name}")
+                    add_items(len(df))
+                    progress.advance()
+                    
+                    logging.info(f"Added {file_name} as sheet {sheet_name}")
 
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error in merging workbook: {e}")
             raise
 
     @staticmethod
-    def merge_worksheet(folder_path):
+    @tracked('Merging worksheets')
+    @instrumented('excel.merge_worksheet')
+    @cached('excel.merge_worksheet')
+    def merge_worksheet(folder_path, output_folder='Output', streaming=False, chunksize=50000, output_format='xlsx',
+                        workers=None, recursive=False, include=None, exclude=None):
+        """
+        Merge every CSV/XLSX in folder_path into one sheet with a 'Source File' column.
+
+        With streaming=True, CSVs are read in chunks of `chunksize` rows and XLSX files in
+        openpyxl read-only mode, and rows go straight to a constant-memory writer, so memory
+        no longer grows with the input size. Columns line up as in pd.concat. Rows past
+        Excel's 1,048,576-row limit spill into Sheet2, Sheet3, ...; output_format='csv'
+        writes merged_worksheet.csv instead. Otherwise files are parsed in a pool of
+        `workers` processes. recursive, include and exclude select the inputs as in
+        Asset.discovery.discover.
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
+            file_names = list(discover_names(folder_path, ('.xlsx', '.csv'), recursive, include, exclude))
+            
+            if streaming:
+                if not file_names:
+                    raise ValueError("No Excel or CSV files found in the specified folder")
+                output_path = output_folder / f"merged_worksheet.{output_format}"
+                progress.start(None, 'rows')
+                row_count = _stream_merge_worksheet(folder_path, file_names, output_path, chunksize, output_format)
+                add_items(row_count)
+                logging.info(f"{row_count} rows from {len(file_names)} files merged into single worksheet at {output_path}")
+                return True
+
             output_path = output_folder / "merged_worksheet.xlsx"
             
-            all_dfs = []
-            for file_name in sorted(os.listdir(folder_path)):
-                if file_name.endswith(('.xlsx', '.csv')):
-                    file_path = Path(folder_path) / file_name
-                    df = pd.read_csv(file_path) if file_name.endswith('.csv') else pd.read_excel(file_path)
-                    df['Source File'] = file_name
+            progress.start(len(file_names), 'files')
+            with phase('read'):
+                all_dfs = []
+                for _, df in _load_frames(folder_path, file_names, workers):
                     all_dfs.append(df)
+                    progress.advance()
 
             if all_dfs:
                 combined_df = pd.concat(all_dfs, ignore_index=True)
-                combined_df.to_excel(output_path, index=False)
+                with phase('write'):
+                    combined_df.to_excel(output_path, index=False)
+                add_items(len(combined_df))
                 logging.info(f"All files merged into single worksheet at {output_path}")
                 return True
             else:
                 raise ValueError("No Excel or CSV files found in the specified folder")
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error in merging worksheet: {e}")
             raise
 
     @staticmethod
-    def excel_to_csv(excel_path):
+    @tracked('Exporting sheets')
+    @instrumented('excel.excel_to_csv')
+    @cached('excel.excel_to_csv')
+    def excel_to_csv(excel_path, output_folder='Output', output_format='csv', workers=None):
+        """
+        Export every sheet of a workbook to <stem>_<sheet>.csv.
+
+        Rows are streamed to the output without building a DataFrame: each sheet is parsed
+        once, its rows spooled to a temporary file while each column's type is settled, and
+        the cells are then written as pd.read_excel and to_csv would, whichever reader
+        engine is used. Sheets are exported in parallel by `workers` processes.
+        output_format may also be 'csv.gz' (gzip-compressed CSV) or 'parquet' (needs
+        pyarrow or fastparquet, and does go through pandas to keep column types).
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
-            xls = pd.ExcelFile(excel_path)
-            for sheet_name in xls.sheet_names:
-                df = pd.read_excel(excel_path, sheet_name=sheet_name)
-                output_path = output_folder / f"{Path(excel_path).stem}_{sheet_name}.csv"
-                df.to_csv(output_path, index=False)
-                logging.info(f"Sheet {sheet_name} converted to CSV: {output_path}")
+            if output_format not in ('csv', 'csv.gz', 'parquet'):
+                raise ValueError(f"Unsupported output format: {output_format}")
+
+            tasks = [(str(excel_path), sheet_name,
+                      str(output_folder / f"{Path(excel_path).stem}_{sheet_name}.{output_format}"), output_format)
+                     for sheet_name in _sheet_names(excel_path)]
+            progress.start(len(tasks), 'sheets')
+            for sheet_name, output_path, row_count in parallel_map(_export_sheet, tasks, workers):
+                add_items(row_count)
+                progress.advance()
+                logging.info(f"Sheet {sheet_name} converted to {output_format.upper()} ({row_count} rows): {output_path}")
             
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error converting Excel to CSV: {e}")
             raise
 
     @staticmethod
-    def csv_to_excel(csv_path):
+    @tracked('Converting CSV to Excel')
+    @instrumented('excel.csv_to_excel')
+    @cached('excel.csv_to_excel')
+    def csv_to_excel(csv_path, output_folder='Output', large_file=False, chunksize=100000, sample_rows=10000):
+        """
+        Convert a CSV to a styled single-sheet workbook with auto-sized columns.
+
+        large_file=True reads the CSV in chunks of `chunksize` rows and writes them through
+        xlsxwriter's constant_memory mode. Column widths are then estimated from the first
+        sample_rows rows, and rows past Excel's limit continue on Sheet2, Sheet3, ...
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
-            
-            df = pd.read_csv(csv_path)
             output_path = output_folder / f"{Path(csv_path).stem}.xlsx"
             
+            if large_file:
+                sample = pd.read_csv(csv_path, nrows=sample_rows)
+                writer = _StreamingSheetWriter(output_path, sample.columns, 'xlsx',
+                                               header_format=CSV_HEADER_FORMAT,
+                                               column_widths=_column_widths(sample))
+                progress.start(None, 'rows')
+                try:
+                    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+                        writer.write_rows(_frame_rows(chunk))
+                        progress.advance(len(chunk))
+                finally:
+                    writer.close()
+                add_items(writer.rows_written)
+                logging.info(f"CSV converted to Excel ({writer.rows_written} rows): {output_path}")
+                return True
+
+            with phase('read'):
+                df = pd.read_csv(csv_path)
+            
             # Create a styled Excel file
             writer = pd.ExcelWriter(output_path, engine='xlsxwriter')
-            df.to_excel(writer, index=False, sheet_name='Sheet1')
+            with phase('write'):
+                df.to_excel(writer, index=False, sheet_name='Sheet1')
             
             # Get workbook and worksheet objects
             workbook = writer.book
             worksheet = writer.sheets['Sheet1']
             
             # Add some formatting
-            header_format = workbook.add_format({
-                'bold': True,
-                'bg_color': '#D7E4BC',
-                'border': 1
-            })
+            header_format = workbook.add_format(CSV_HEADER_FORMAT)
             
             # Format the header row
             for col_num, value in enumerate(df.columns.values):
                 worksheet.write(0, col_num, value, header_format)
             
             # Auto-adjust columns width
-            for idx, col in enumerate(df.columns):
-                series = df[col]
-                max_len = max(
-                    series.astype(str).map(len).max(),
-                    len(str(series.name))
-                ) + 1
-                worksheet.set_column(idx, idx, max_len)
+            for idx, width in enumerate(_column_widths(df)):
+                worksheet.set_column(idx, idx, width)
             
-            writer.close()
+            with phase('save'):
+                writer.close()
+            add_items(len(df))
             logging.info(f"CSV converted to Excel: {output_path}")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error converting CSV to Excel: {e}")
             raise
 
     @staticmethod
-    def format_excel(excel_path):
+    @tracked('Formatting workbook')
+    @instrumented('excel.format_excel')
+    @cached('excel.format_excel')
+    def format_excel(excel_path, output_folder='Output', streaming=False, sample_rows=None):
+        """
+        Style the header row and size every column to its longest value.
+
+        streaming=True keeps memory bounded: the workbook is read twice in read-only mode,
+        once to measure column widths (only the first sample_rows rows when set) and once
+        to copy the values into a write-only workbook. Streaming copies values and formulas
+        only; other formatting of the source cells is not carried over.
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
+            output_path = output_folder / f"{Path(excel_path).stem}_formatted.xlsx"
             
-            wb = openpyxl.load_workbook(excel_path)
+            if streaming:
+                _stream_format_excel(excel_path, output_path, sample_rows)
+                logging.info(f"Excel file formatted and saved to {output_path}")
+                return True
+
+            with phase('read'):
+                wb = openpyxl.load_workbook(excel_path)
             
+            progress.start(len(wb.sheetnames), 'sheets')
             for sheet in wb.sheetnames:
                 ws = wb[sheet]
                 
                 # Format header row
-                header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-                header_font = Font(bold=True)
-                
                 for cell in ws[1]:
-                    cell.fill = header_fill
-                    cell.font = header_font
+                    cell.fill = HEADER_FILL
+                    cell.font = HEADER_FONT
                 
                 # Auto-adjust column widths
-                for column in ws.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = (max_length + 2)
-                    ws.column_dimensions[column_letter].width = adjusted_width
+                widths = _max_text_lengths(ws.iter_rows(values_only=True), sample_rows)
+                for idx, max_length in enumerate(widths, start=1):
+                    ws.column_dimensions[get_column_letter(idx)].width = max_length + 2
+                progress.advance()
             
-            output_path = output_folder / f"{Path(excel_path).stem}_formatted.xlsx"
-            wb.save(output_path)
+            with phase('save'):
+                wb.save(output_path)
+            add_items(sum(wb[sheet].max_row for sheet in wb.sheetnames))
             logging.info(f"Excel file formatted and saved to {output_path}")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error formatting Excel file: {e}")
             raise
+
+
+CSV_HEADER_FORMAT = {
+    'bold': True,
+    'bg_color': '#D7E4BC',
+    'border': 1
+}
+
+
+def _column_widths(df):
+    """Longest rendered value (or the column name) in each column, plus one."""
+    widths = []
+    for col in df.columns:
+        series = df[col]
+        longest = series.astype(str).str.len().max() if len(series) else 0
+        widths.append(max(longest, len(str(series.name))) + 1)
+    return widths
+
+
+HEADER_FILL = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+HEADER_FONT = Font(bold=True)
+
+
+def _max_text_lengths(rows, sample_rows=None, batch_size=10000):
+    """
+    Longest str() of the values in each column, counting empty cells as 'None'.
+
+    Rows are measured a batch at a time, column by column, so the per-cell work runs
+    inside map()/max() rather than in Python loops.
+    """
+    widths = []
+
+    def measure(batch):
+        for idx, column in enumerate(itertools.zip_longest(*batch)):
+            length = max(map(len, map(str, column)))
+            if idx == len(widths):
+                widths.append(length)
+            elif length > widths[idx]:
+                widths[idx] = length
+
+    batch = []
+    for row in itertools.islice(rows, sample_rows):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            measure(batch)
+            batch = []
+    if batch:
+        measure(batch)
+    return widths
+
+
+def _stream_format_excel(excel_path, output_path, sample_rows):
+    source = openpyxl.load_workbook(excel_path, read_only=True)
+    target = openpyxl.Workbook(write_only=True)
+    try:
+        progress.start(len(source.worksheets), 'sheets')
+        for ws in source.worksheets:
+            widths = _max_text_lengths(ws.iter_rows(values_only=True), sample_rows)
+
+            ws_out = target.create_sheet(ws.title)
+            for idx, max_length in enumerate(widths, start=1):
+                ws_out.column_dimensions[get_column_letter(idx)].width = max_length + 2
+
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is not None:
+                ws_out.append([_header_cell(ws_out, value) for value in header])
+            for row in rows:
+                ws_out.append(row)
+            progress.advance()
+        target.save(output_path)
+    finally:
+        source.close()
+
+
+def _header_cell(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.fill = HEADER_FILL
+    cell.font = HEADER_FONT
+    return cell
+
+def unique_sheet_name(file_name, used):
+    """
+    A valid sheet name for file_name that is not in used (casefolded names), which it joins.
+
+    Characters Excel rejects, such as the '/' of files from subfolders, become '_'. Names are
+    cut to 31 characters, and names that then repeat get a ~2, ~3, ... suffix.
+    """
+    base = re.sub(r'[\[\]:*?/\\]', '_', file_name)[:31]
+    name, number = base, 1
+    while name.casefold() in used:
+        number += 1
+        suffix = f"~{number}"
+        name = base[:31 - len(suffix)] + suffix
+    used.add(name.casefold())
+    return name
+
+
+def _load_frame(task):
+    """Pool worker: parse one CSV/XLSX; returns (file_name, DataFrame, parse seconds)."""
+    file_path, file_name = task
+    start = time.perf_counter()
+    df = pd.read_csv(file_path) if file_name.lower().endswith('.csv') else _read_excel(file_path)
+    df['Source File'] = file_name
+    return file_name, df, time.perf_counter() - start
+
+
+def _load_frames(folder_path, file_names, workers=None):
+    """
+    Yield (file_name, DataFrame) in file_names order while a process pool parses ahead.
+
+    Only a couple of parsed files per worker wait for the consumer at any time.
+    """
+    tasks = [(str(Path(folder_path) / file_name), file_name) for file_name in file_names]
+    for file_name, df, seconds in bounded_map(_load_frame, tasks, workers):
+        logging.info(f"Parsed {file_name} ({len(df)} rows) in {seconds:.2f}s")
+        yield file_name, df
+
+
+def _sheet_names(excel_path):
+    if reader_engine() == 'calamine':
+        from python_calamine import CalamineWorkbook
+        return CalamineWorkbook.from_path(str(excel_path)).sheet_names
+    wb = openpyxl.load_workbook(excel_path, read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+
+def _iter_sheet_rows(excel_path, sheet_name):
+    """Yield the cell values of one sheet row by row, normalised as pandas' readers report them."""
+    if reader_engine() == 'calamine':
+        from python_calamine import CalamineWorkbook
+        rows = CalamineWorkbook.from_path(str(excel_path)).get_sheet_by_name(sheet_name).iter_rows()
+        for row in rows:
+            yield [_normalise_cell(value) for value in row]
+        return
+
+    wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        for row in wb[sheet_name].iter_rows(values_only=True):
+            yield [_normalise_cell(value) for value in row]
+    finally:
+        wb.close()
+
+
+def _normalise_cell(value):
+    # Both pandas readers turn whole floats into ints and dates into timestamps; calamine
+    # reports empty cells as '', numbers as floats and date-only cells as dates
+    if value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return datetime.datetime.combine(value, datetime.time())
+    return value
+
+
+class _SheetProfile:
+    """
+    Settles, row by row, what pd.read_excel(...).to_csv() needs to know about a whole sheet.
+
+    Rows are measured as they stream past: the sheet's width (trailing all-blank columns
+    are dropped), its last data row (trailing blank rows are dropped) and each column's
+    type. A column of numbers with a fraction or a blank becomes float64, so its whole
+    numbers are written as 2.0; a column of timestamps all at midnight is written as dates.
+    """
+
+    def __init__(self, header):
+        self.width = _used_width(header)
+        self.rows = 0
+        self.data_rows = 0
+        self.shortest = None
+        self.interior_blank = False
+        self.numeric, self.fractional, self.blank, self.timestamps, self.timed = {}, set(), set(), {}, set()
+
+    def add(self, row):
+        self.rows += 1
+        used = _used_width(row)
+        if not used:
+            return
+        # Blank rows only count once a data row follows them, as pandas keeps those
+        self.interior_blank = self.interior_blank or self.data_rows < self.rows - 1
+        self.data_rows = self.rows
+        self.width = max(self.width, used)
+        self.shortest = used if self.shortest is None else min(self.shortest, used)
+        for index, value in enumerate(row[:used]):
+            if value is None:
+                self.blank.add(index)
+                continue
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            self.numeric[index] = self.numeric.get(index, True) and is_number
+            if isinstance(value, float):
+                self.fractional.add(index)
+            is_timestamp = isinstance(value, datetime.datetime)
+            self.timestamps[index] = self.timestamps.get(index, True) and is_timestamp
+            if is_timestamp and value.time() != datetime.time():
+                self.timed.add(index)
+
+    def formatters(self):
+        """{column index: formatter} for the columns pandas would not write as-is."""
+        formatters = {}
+        for index, only_numbers in self.numeric.items():
+            # Shorter rows are padded with blanks, and a blank row leaves a gap in every column
+            blank = index in self.blank or self.interior_blank or index >= (self.shortest or 0)
+            if only_numbers and (index in self.fractional or blank):
+                formatters[index] = float
+            elif self.timestamps[index] and index not in self.timed:
+                formatters[index] = datetime.datetime.date
+        return formatters
+
+
+def _used_width(row):
+    """Index after the last non-blank cell of row, 0 for a blank row."""
+    for index in range(len(row) - 1, -1, -1):
+        if row[index] is not None:
+            return index + 1
+    return 0
+
+
+def _export_sheet(task):
+    """Pool worker for excel_to_csv; returns (sheet_name, output_path, data rows written)."""
+    excel_path, sheet_name, output_path, output_format = task
+    if output_format == 'parquet':
+        df = _read_excel(excel_path, sheet_name=sheet_name)
+        df.to_parquet(output_path, index=False)
+        return sheet_name, output_path, len(df)
+
+    # The sheet is parsed once: rows are spooled to disk while each column's type is
+    # settled, as pandas would, and then written out from the spool
+    with tempfile.TemporaryFile() as spool:
+        rows = _iter_sheet_rows(excel_path, sheet_name)
+        header = next(rows, None)
+        profile = _SheetProfile(header or ())
+        for row in rows:
+            profile.add(row)
+            pickle.dump(row, spool, pickle.HIGHEST_PROTOCOL)
+        spool.seek(0)
+
+        formatters = profile.formatters()
+        width = profile.width
+        opener = gzip.open if output_format == 'csv.gz' else open
+        with opener(output_path, 'wt', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            if header is not None:
+                writer.writerow(_xlsx_header((list(header[:width]) + [None] * width)[:width]))
+            for _ in range(profile.data_rows):
+                row = (pickle.load(spool)[:width] + [None] * width)[:width]
+                writer.writerow([value if value is None or index not in formatters else formatters[index](value)
+                                 for index, value in enumerate(row)])
+    return sheet_name, output_path, profile.data_rows
+
+
+def _without_trailing_blanks(rows):
+    """pd.read_excel keeps blank rows between data rows but drops those at the end."""
+    blanks = 0
+    for row in rows:
+        if all(value is None for value in row):
+            blanks += 1
+            continue
+        for _ in range(blanks):
+            yield [None] * len(row)
+        blanks = 0
+        yield row
+
+
+EXCEL_MAX_ROWS = 1048576
+
+
+class _StreamingSheetWriter:
+    """
+    Write rows to an xlsx (xlsxwriter constant_memory mode) or csv file as they arrive.
+
+    Every xlsx sheet starts with the header row; once a sheet reaches EXCEL_MAX_ROWS
+    the writer continues on a new sheet.
+    """
+
+    def __init__(self, output_path, columns, output_format='xlsx', header_format=None, column_widths=None):
+        self.columns = list(columns)
+        self.output_format = output_format
+        self.header_format = header_format
+        self.column_widths = column_widths
+        self.rows_written = 0
+
+        if output_format == 'csv':
+            self._file = open(output_path, 'w', encoding='utf-8', newline='')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.columns)
+        elif output_format == 'xlsx':
+            self.workbook = xlsxwriter.Workbook(str(output_path), {
+                'constant_memory': True,
+                'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+                'strings_to_formulas': False,
+                'strings_to_urls': False,
+            })
+            self._header_style = self.workbook.add_format(header_format) if header_format else None
+            self._sheet_count = 0
+            self._new_sheet()
+        else:
+            raise ValueError(f"Unsupported output format: {output_format}")
+
+    def _new_sheet(self):
+        self._sheet_count += 1
+        self.worksheet = self.workbook.add_worksheet(f"Sheet{self._sheet_count}")
+        for idx, width in enumerate(self.column_widths or []):
+            self.worksheet.set_column(idx, idx, width)
+        self.worksheet.write_row(0, 0, self.columns, self._header_style)
+        self._row = 1
+
+    def write_rows(self, rows):
+        if self.output_format == 'csv':
+            for row in rows:
+                self._csv.writerow(row)
+                self.rows_written += 1
+            return
+
+        for row in rows:
+            if self._row >= EXCEL_MAX_ROWS:
+                self._new_sheet()
+            self.worksheet.write_row(self._row, 0, row)
+            self._row += 1
+            self.rows_written += 1
+
+    def close(self):
+        if self.output_format == 'csv':
+            self._file.close()
+        else:
+            self.workbook.close()
+
+
+def _frame_rows(df):
+    """DataFrame rows as tuples of plain Python values, with None for missing cells."""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def _xlsx_header(values):
+    """Column names as pd.read_excel would produce them for a header row."""
+    names, seen = [], {}
+    for idx, value in enumerate(values):
+        name = f"Unnamed: {idx}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _read_header(file_path):
+    if str(file_path).lower().endswith('.csv'):
+        return list(pd.read_csv(file_path, nrows=0).columns)
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        first_row = next(wb.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        return _xlsx_header(first_row)
+    finally:
+        wb.close()
+
+
+def _iter_row_batches(file_path, file_name, columns, chunksize):
+    """Yield batches of rows from one input file, re-ordered to the merged columns."""
+    if file_name.lower().endswith('.csv'):
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            chunk['Source File'] = file_name
+            yield _frame_rows(chunk.reindex(columns=columns))
+        return
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = _xlsx_header(next(rows, ()))
+        positions = {name: idx for idx, name in enumerate(header)}
+        source_index = [positions.get(column) for column in columns]
+        batch = []
+        # Normalised and blank rows kept as pd.read_excel does, so both merge modes agree
+        for row in _without_trailing_blanks([_normalise_cell(value) for value in row] for row in rows):
+            batch.append(tuple(
+                file_name if column == 'Source File' else (row[idx] if idx is not None and idx < len(row) else None)
+                for column, idx in zip(columns, source_index)
+            ))
+            if len(batch) >= chunksize:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        wb.close()
+
+
+def _stream_merge_worksheet(folder_path, file_names, output_path, chunksize, output_format):
+    # Columns follow pd.concat: the first file's columns plus 'Source File', then new ones as seen
+    columns = []
+    for file_name in file_names:
+        for column in _read_header(Path(folder_path) / file_name) + ['Source File']:
+            if column not in columns:
+                columns.append(column)
+
+    writer = _StreamingSheetWriter(output_path, columns, output_format)
+    try:
+        for file_name in file_names:
+            for batch in _iter_row_batches(Path(folder_path) / file_name, file_name, columns, chunksize):
+                # CSV batches are row iterators, so count what the writer actually wrote
+                written = writer.rows_written
+                writer.write_rows(batch)
+                progress.advance(writer.rows_written - written)
+            logging.info(f"Merged {file_name} into single worksheet")
+    finally:
+        writer.close()
+    return writer.rows_written
@@ -1,9 +1,24 @@
+import csv
+import io
+import itertools
+import json
 import logging
-from PIL import Image, ImageDraw, ImageFont
-from PIL.ExifTags import TAGS
+import pickle
+import tempfile
+from PIL import Image
 from pathlib import Path
 import os
-from fpdf import FPDF
+from Asset import progress
+from Asset.cache import cached
+from Asset.discovery import discover, discover_names, mirror_folder
+from Asset.image_metadata import read_exif, strip_metadata
+from Asset.metrics import add_items, instrumented, phase
+from Asset.progress import OperationCancelled, tracked
+from Asset.utils import parallel_map
+
+# Default (width, height) boxes for make_thumbnails
+THUMBNAIL_SIZES = ((1024, 1024), (512, 512), (256, 256), (128, 128))
+EXIF_BATCH_ROWS = 50000
 
 class ImageHandler:
     @staticmethod
@@ -53,21 +68,21 @@ class ImageHandler:
                 print("\n\033[91mInvalid choice. Please enter a valid option.\033[0m")
 
     @staticmethod
-    def extract_data(image_path):
+    @tracked('Extracting EXIF data')
+    @instrumented('image.extract_data')
+    @cached('image.extract_data')
+    def extract_data(image_path, output_folder='Output/EXIF_Data'):
         try:
-            output_folder = Path('Output/EXIF_Data')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
-            image = Image.open(image_path)
-            exif_data = image._getexif()
+            exif_data = read_exif(image_path)
             
             output_path = output_folder / f"{Path(image_path).stem}_exif_data.txt"
             
             if exif_data:
                 with open(output_path, 'w', encoding='utf-8') as f:
-                    for tag_id in exif_data:
-                        tag = TAGS.get(tag_id, tag_id)
-                        data = exif_data.get(tag_id)
+                    for tag, data in exif_data.items():
                         f.write(f"{tag}: {data}\n")
                 
                 logging.info(f"EXIF data saved to {output_path}")
@@ -76,76 +91,210 @@ class ImageHandler:
             else:
                 print("\n\033[93m⚠ No EXIF data found in the image\033[0m")
                 return False
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error extracting EXIF data: {e}")
             print(f"\n\033[91m❌ Error extracting EXIF data: {e}\033[0m")
             raise
 
     @staticmethod
-    def remove_exif_data(image_path):
+    @tracked('Extracting EXIF data')
+    @instrumented('image.extract_data_batch')
+    @cached('image.extract_data_batch')
+    def extract_data_batch(folder_path, output_folder='Output/EXIF_Data', output_format='csv', workers=None,
+                           include=None, exclude=None):
+        """
+        Extract EXIF from every JPEG/PNG under folder_path (recursively) into one table.
+
+        Writes exif_metadata.<csv|jsonl|parquet> with one row per image, keyed by the path
+        relative to folder_path. Headers are parsed in a pool of `workers` processes.
+        JSON Lines output is streamed. CSV and Parquet need the full column set first, so
+        rows are spooled to a temporary file and then written in batches; Parquet stores
+        every tag as a nullable string column and needs pyarrow or fastparquet.
+        """
         try:
-            output_folder = Path('Output/Clean_Images')
+            output_folder = Path(output_folder)
+            output_folder.mkdir(parents=True, exist_ok=True)
+
+            if output_format not in ('csv', 'jsonl', 'parquet'):
+                raise ValueError(f"Unsupported output format: {output_format}")
+
+            image_paths = [entry.path for entry in discover(folder_path, ('.png', '.jpg', '.jpeg'), True,
+                                                            include, exclude)]
+
+            if not image_paths:
+                print("\n\033[93m⚠ No supported image files found in the folder\033[0m")
+                return False
+
+            output_path = output_folder / f"exif_metadata.{output_format}"
+            tasks = [(path, folder_path) for path in image_paths]
+            progress.start(len(tasks), 'images')
+            rows = _advancing(parallel_map(_read_exif_row, tasks, workers, chunksize=256))
+
+            if output_format == 'jsonl':
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    for row in rows:
+                        f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+            else:
+                with tempfile.TemporaryFile() as spool:
+                    columns = _spool_rows(rows, spool)
+                    if output_format == 'csv':
+                        with open(output_path, 'w', encoding='utf-8', newline='') as f:
+                            writer = csv.DictWriter(f, fieldnames=columns)
+                            writer.writeheader()
+                            writer.writerows(_unspool_rows(spool))
+                    else:
+                        _write_parquet(output_path, columns, _unspool_rows(spool))
+
+            add_items(len(image_paths))
+            logging.info(f"EXIF data of {len(image_paths)} image(s) saved to {output_path}")
+            print(f"\n\033[92m✔ EXIF data of {len(image_paths)} image(s) extracted to: {output_path}\033[0m")
+            return True
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"Error extracting EXIF data: {e}")
+            print(f"\n\033[91m❌ Error extracting EXIF data: {e}\033[0m")
+            raise
+
+    @staticmethod
+    @tracked('Removing EXIF data')
+    @instrumented('image.remove_exif_data')
+    @cached('image.remove_exif_data')
+    def remove_exif_data(image_path, output_folder='Output/Clean_Images'):
+        """Save a copy of the image without EXIF/XMP/IPTC/text metadata."""
+        try:
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
-            
-            image = Image.open(image_path)
-            data = list(image.getdata())
-            image_without_exif = Image.new(image.mode, image.size)
-            image_without_exif.putdata(data)
             
             output_path = output_folder / f"{Path(image_path).stem}_no_exif{Path(image_path).suffix}"
-            image_without_exif.save(output_path)
+            _strip_image_metadata(image_path, output_path)
             
             logging.info(f"EXIF data removed from {image_path}")
             print(f"\n\033[92m✔ Image saved without EXIF data: {output_path}\033[0m")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error removing EXIF data: {e}")
             print(f"\n\033[91m❌ Error removing EXIF data: {e}\033[0m")
             raise
 
     @staticmethod
-    def compress_image(image_path, quality=85):
+    @tracked('Removing EXIF data')
+    @instrumented('image.remove_exif_folder')
+    @cached('image.remove_exif_folder')
+    def remove_exif_folder(folder_path, output_folder='Output/Clean_Images', workers=None,
+                           recursive=False, include=None, exclude=None):
+        """
+        Strip metadata from every image in folder_path using a pool of `workers` processes.
+
+        With recursive=True, subfolders are included and mirrored under output_folder.
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
+            output_folder.mkdir(parents=True, exist_ok=True)
+
+            image_files = list(discover_names(folder_path, ('.png', '.jpg', '.jpeg'), recursive, include, exclude))
+
+            if not image_files:
+                print("\n\033[93m⚠ No supported image files found in the folder\033[0m")
+                return False
+
+            tasks = [(str(Path(folder_path) / f), str(mirror_folder(output_folder, f))) for f in image_files]
+            cleaned, failed = 0, 0
+            progress.start(len(tasks), 'images')
+            for filename, error in _advancing(parallel_map(_strip_image_file, tasks, workers, chunksize=16)):
+                if error is None:
+                    cleaned += 1
+                    logging.info(f"EXIF data removed from {Path(folder_path) / filename}")
+                else:
+                    failed += 1
+                    progress.fail(filename)
+                    logging.error(f"Error removing EXIF data from {filename}: {error}")
+                    print(f"\033[91m❌ Error removing EXIF data from {filename}: {error}\033[0m")
+
+            add_items(cleaned)
+            logging.info(f"Metadata stripped from {cleaned} image(s), {failed} failed")
+            print(f"\n\033[92m✔ Cleaned {cleaned} image(s), {failed} failed: {output_folder}\033[0m")
+            return failed == 0
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"Error removing EXIF data: {e}")
+            print(f"\n\033[91m❌ Error removing EXIF data: {e}\033[0m")
+            raise
+
+    @staticmethod
+    @tracked('Compressing image')
+    @instrumented('image.compress_image')
+    @cached('image.compress_image')
+    def compress_image(image_path, quality=85, output_folder='Output'):
+        try:
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
-            image = Image.open(image_path)
+            with phase('decode'):
+                image = Image.open(image_path)
+                image.load()
             output_path = output_folder / f"{Path(image_path).stem}_compressed{Path(image_path).suffix}"
             
-            image.save(output_path, quality=quality, optimize=True)
+            with phase('encode'):
+                image.save(output_path, quality=quality, optimize=True)
             
             logging.info(f"Image compressed and saved to {output_path}")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error compressing image: {e}")
             raise
 
     @staticmethod
-    def convert_format(image_path, target_format='PNG'):
+    @tracked('Converting image')
+    @instrumented('image.convert_format')
+    @cached('image.convert_format')
+    def convert_format(image_path, target_format='PNG', output_folder='Output'):
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
-            image = Image.open(image_path)
+            with phase('decode'):
+                image = Image.open(image_path)
+                image.load()
             target_format = target_format.upper()
             
-            if image.mode in ('RGBA', 'LA') and target_format == 'JPEG':
+            if image.mode in ('RGBA', 'LA') and _pil_format(target_format) == 'JPEG':
                 # Convert RGBA to RGB for JPEG
-                image = image.convert('RGB')
+                with phase('transform'):
+                    image = image.convert('RGB')
             
             output_path = output_folder / f"{Path(image_path).stem}.{target_format.lower()}"
-            image.save(output_path, target_format)
+            with phase('encode'):
+                image.save(output_path, _pil_format(target_format))
             
             logging.info(f"Image converted and saved to {output_path}")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error converting image format: {e}")
             raise
 
     @staticmethod
-    def resize_image(image_path, width=None, height=None):
+    @tracked('Resizing image')
+    @instrumented('image.resize_image')
+    @cached('image.resize_image')
+    def resize_image(image_path, width=None, height=None, output_folder='Output', reducing_gap=3.0):
+        """
+        Resize an image to width and/or height (the other side keeps the aspect ratio).
+
+        JPEGs are decoded at the smallest DCT scale that still covers the target size, and
+        reducing_gap lets Pillow box-reduce before the final LANCZOS pass; None disables it.
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
             image = Image.open(image_path)
@@ -162,135 +311,382 @@ class ImageHandler:
             else:
                 raise ValueError("Either width or height must be specified")
             
-            resized_image = image.resize(new_size, Image.LANCZOS)
+            with phase('decode'):
+                # No-op for formats other than JPEG
+                image.draft(image.mode, new_size)
+                image.load()
+            with phase('transform'):
+                resized_image = image.resize(new_size, Image.LANCZOS, reducing_gap=reducing_gap)
             output_path = output_folder / f"{Path(image_path).stem}_resized{Path(image_path).suffix}"
-            resized_image.save(output_path)
+            with phase('encode'):
+                resized_image.save(output_path)
             
             logging.info(f"Image resized and saved to {output_path}")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error resizing image: {e}")
             raise
 
     @staticmethod
-    def batch_convert_format(input_folder, output_format):
+    @tracked('Creating thumbnails')
+    @instrumented('image.make_thumbnails')
+    @cached('image.make_thumbnails')
+    def make_thumbnails(image_path, sizes=THUMBNAIL_SIZES, output_folder='Output/Thumbnails', reducing_gap=3.0):
+        """
+        Write one thumbnail per (width, height) box in sizes from a single decode.
+
+        Thumbnails keep the aspect ratio and are saved as <stem>_<width>x<height><suffix>.
+        """
         try:
-            output_folder = Path('Output/Converted_Images')
+            output_folder = Path(output_folder)
+            output_folder.mkdir(parents=True, exist_ok=True)
+
+            for output_path in _write_thumbnails(image_path, sizes, output_folder, reducing_gap):
+                logging.info(f"Thumbnail saved to {output_path}")
+            return True
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"Error creating thumbnails: {e}")
+            raise
+
+    @staticmethod
+    @tracked('Creating thumbnails')
+    @instrumented('image.batch_thumbnails')
+    @cached('image.batch_thumbnails')
+    def batch_thumbnails(folder_path, sizes=THUMBNAIL_SIZES, output_folder='Output/Thumbnails',
+                         reducing_gap=3.0, workers=None, recursive=False, include=None, exclude=None):
+        """
+        Run make_thumbnails for every image in folder_path in a pool of `workers` processes.
+
+        With recursive=True, subfolders are included and mirrored under output_folder.
+        """
+        try:
+            output_folder = Path(output_folder)
+            output_folder.mkdir(parents=True, exist_ok=True)
+
+            image_files = list(discover_names(folder_path, ('.png', '.jpg', '.jpeg'), recursive, include, exclude))
+
+            if not image_files:
+                print("\n\033[93m⚠ No supported image files found in the folder\033[0m")
+                return False
+
+            tasks = [(str(Path(folder_path) / f), tuple(sizes), str(mirror_folder(output_folder, f)), reducing_gap)
+                     for f in image_files]
+            done, failed = 0, 0
+            progress.start(len(tasks), 'images')
+            for filename, error in _advancing(parallel_map(_thumbnail_file, tasks, workers, chunksize=8)):
+                if error is None:
+                    done += 1
+                else:
+                    failed += 1
+                    progress.fail(filename)
+                    logging.error(f"Error creating thumbnails for {filename}: {error}")
+                    print(f"\033[91m❌ Error creating thumbnails for {filename}: {error}\033[0m")
+
+            add_items(done)
+            logging.info(f"Thumbnails created for {done} image(s), {failed} failed")
+            print(f"\n\033[92m✔ Thumbnails created for {done} image(s), {failed} failed\033[0m")
+            return failed == 0
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            logging.error(f"Error creating thumbnails: {e}")
+            raise
+
+    @staticmethod
+    @tracked('Converting images')
+    @instrumented('image.batch_convert_format')
+    @cached('image.batch_convert_format')
+    def batch_convert_format(input_folder, output_format, output_folder='Output/Converted_Images',
+                             workers=None, chunksize=None, recursive=False, include=None, exclude=None):
+        """
+        Convert every PNG/JPEG in input_folder to output_format.
+
+        Files are converted in a process pool of `workers` processes (all CPUs by default,
+        1 for a serial run) and dispatched in chunks of `chunksize` files. A failing file
+        is logged and reported without stopping the rest of the batch. With recursive=True,
+        subfolders are included and mirrored under output_folder.
+        """
+        try:
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
             supported_formats = ('.png', '.jpg', '.jpeg')
-            input_files = [f for f in os.listdir(input_folder) 
-                         if f.lower().endswith(supported_formats)]
+            input_files = list(discover_names(input_folder, supported_formats, recursive, include, exclude))
 
             if not input_files:
                 print("\n\033[93m⚠ No supported image files found in the folder\033[0m")
                 return False
 
-            for filename in input_files:
-                file_path = Path(input_folder) / filename
-                try:
-                    with Image.open(file_path) as img:
-                        img = img.convert("RGB")
-                        new_filename = f"{Path(filename).stem}.{output_format}"
-                        output_path = output_folder / new_filename
-                        
-                        img.save(output_path, output_format.upper(), quality=100)
-                        logging.info(f"Converted: {file_path} → {output_path}")
-                        print(f"\033[92m✔ {filename} → {new_filename}\033[0m")
-                        
-                except Exception as e:
-                    logging.error(f"Error converting {file_path}: {e}")
-                    print(f"\033[91m❌ Error converting {filename}: {e}\033[0m")
-            
-            return True
+            workers = workers or os.cpu_count() or 1
+            if chunksize is None:
+                # Roughly four chunks per worker keeps the pool balanced without per-file IPC
+                chunksize = min(64, max(1, len(input_files) // (workers * 4)))
+
+            tasks = [(str(Path(input_folder) / filename), str(mirror_folder(output_folder, filename)), output_format)
+                     for filename in input_files]
+            converted, failed = 0, 0
+            progress.start(len(tasks), 'images')
+            results = _advancing(parallel_map(_convert_image_file, tasks, workers, chunksize))
+            # parallel_map keeps input order, so results line up with the relative input names
+            for relative_name, (filename, new_filename, error) in zip(input_files, results):
+                file_path = Path(input_folder) / relative_name
+                if error is None:
+                    converted += 1
+                    logging.info(f"Converted: {file_path} → {output_folder / Path(relative_name).parent / new_filename}")
+                    print(f"\033[92m✔ {filename} → {new_filename}\033[0m")
+                else:
+                    failed += 1
+                    progress.fail(relative_name)
+                    logging.error(f"Error converting {file_path}: {error}")
+                    print(f"\033[91m❌ Error converting {filename}: {error}\033[0m")
+
+            add_items(converted)
+            logging.info(f"Batch conversion finished: {converted} converted, {failed} failed")
+            print(f"\n\033[92mConverted {converted} file(s), {failed} failed\033[0m")
+            return failed == 0
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error in batch conversion: {e}")
             print(f"\n\033[91m❌ Error in batch conversion: {e}\033[0m")
             raise
 
     @staticmethod
-    def images_to_pdf_with_filenames(folder_path, output_pdf):
+    @tracked('Building image PDF')
+    @instrumented('image.images_to_pdf_with_filenames')
+    @cached('image.images_to_pdf_with_filenames')
+    def images_to_pdf_with_filenames(folder_path, output_pdf, output_folder='Output/PDF_Output',
+                                     max_dpi=200, workers=None, recursive=False, include=None, exclude=None):
+        """
+        Build an A4 PDF with one image per page and its filename as a caption.
+
+        Pages are composed in memory: JPEGs that are already small enough are embedded
+        as-is, larger images are downscaled to max_dpi in a pool of `workers` processes,
+        and the caption is drawn as PDF text rather than burnt into the pixels.
+        """
         try:
-            output_folder = Path('Output/PDF_Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
-            temp_folder = output_folder / "temp"
-            temp_folder.mkdir(exist_ok=True)
             
             output_pdf_path = output_folder / output_pdf
-            
+
+            from fpdf import FPDF
+
             # Initialize PDF with A4 dimensions
-            A4_WIDTH, A4_HEIGHT = 595.28, 841.89
             pdf = FPDF(unit="pt", format="A4")
-            font = ImageFont.load_default()
+            pdf.set_auto_page_break(False)
+            pdf.set_font("Helvetica", size=10)
 
-            image_files = [f for f in os.listdir(folder_path) 
-                         if f.lower().endswith((".png", ".jpg", ".jpeg", ".bmp", ".tiff"))]
+            image_files = list(discover_names(folder_path, (".png", ".jpg", ".jpeg", ".bmp", ".tiff"), recursive,
+                                              include, exclude))
 
             if not image_files:
                 print("\n\033[93m⚠ No supported image files found in the folder\033[0m")
                 return False
 
-            try:
-                for image_file in sorted(image_files):
-                    image_path = Path(folder_path) / image_file
-                    print(f"\033[92m✔ Processing: {image_file}\033[0m")
-
-                    with Image.open(image_path) as img:
-                        # Scale image to fit A4
-                        img_ratio = img.width / img.height
-                        a4_ratio = A4_WIDTH / (A4_HEIGHT - 40)
-
-                        if img_ratio > a4_ratio:
-                            new_width = A4_WIDTH
-                            new_height = int(A4_WIDTH / img_ratio)
-                        else:
-                            new_height = A4_HEIGHT - 40
-                            new_width = int((A4_HEIGHT - 40) * img_ratio)
-
-                        img_resized = img.resize((int(new_width), int(new_height)), Image.LANCZOS)
-                        
-                        # Create page with filename
-                        page = Image.new("RGB", (int(A4_WIDTH), int(A4_HEIGHT)), "white")
-                        img_x = (A4_WIDTH - new_width) // 2
-                        img_y = (A4_HEIGHT - new_height - 40) // 2
-                        page.paste(img_resized, (int(img_x), int(img_y)))
-
-                        # Add filename
-                        draw = ImageDraw.Draw(page)
-                        text = Path(image_file).stem
-                        text_bbox = draw.textbbox((0, 0), text, font=font)
-                        text_width = text_bbox[2] - text_bbox[0]
-                        text_height = text_bbox[3] - text_bbox[1]
-                        text_x = (A4_WIDTH - text_width) // 2
-                        text_y = A4_HEIGHT - text_height - 20
-                        draw.text((text_x, text_y), text, fill="black", font=font)
-
-                        # Save temporary page
-                        temp_path = temp_folder / f"temp_{Path(image_file).stem}.jpg"
-                        page.save(temp_path, "JPEG", quality=95)
-                        
-                        # Add to PDF
-                        pdf.add_page()
-                        pdf.image(str(temp_path), 0, 0, A4_WIDTH, A4_HEIGHT)
-                        temp_path.unlink()
+            tasks = [(str(Path(folder_path) / image_file), max_dpi) for image_file in image_files]
+            progress.start(len(tasks), 'images')
+            for image_file, data, width, height in _advancing(parallel_map(_prepare_pdf_page_image, tasks, workers)):
+                print(f"\033[92m✔ Processing: {image_file}\033[0m")
 
-                pdf.output(str(output_pdf_path))
-                logging.info(f"PDF created: {output_pdf_path}")
-                print(f"\n\033[92m✔ PDF created successfully: {output_pdf_path}\033[0m")
-                return True
+                # Center the image above the caption strip, as the page layout always has
+                pdf.add_page()
+                img_x = (A4_WIDTH - width) / 2
+                img_y = (A4_HEIGHT - height - CAPTION_HEIGHT) / 2
+                pdf.image(io.BytesIO(data), img_x, img_y, width, height)
 
-            finally:
-                # Cleanup temporary files
-                if temp_folder.exists():
-                    for temp_file in temp_folder.glob("*.jpg"):
-                        temp_file.unlink(missing_ok=True)
-                    temp_folder.rmdir()
+                # Core PDF fonts only cover Latin-1
+                text = Path(image_file).stem.encode('latin-1', 'replace').decode('latin-1')
+                pdf.text((A4_WIDTH - pdf.get_string_width(text)) / 2, A4_HEIGHT - 20, text)
 
+            with phase('save'):
+                pdf.output(str(output_pdf_path))
+            add_items(len(image_files))
+            logging.info(f"PDF created: {output_pdf_path}")
+            print(f"\n\033[92m✔ PDF created successfully: {output_pdf_path}\033[0m")
+            return True
+
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error creating PDF: {e}")
             print(f"\n\033[91m❌ Error creating PDF: {e}\033[0m")
             raise
 
+A4_WIDTH, A4_HEIGHT = 595.28, 841.89
+CAPTION_HEIGHT = 40
+
+
+def _advancing(results):
+    """Pass results through, reporting progress (and checking for cancellation) as each arrives."""
+    for result in results:
+        # Advance before yielding: a consumer such as zip() may never ask for the next item
+        progress.advance()
+        yield result
+
+
+def _prepare_pdf_page_image(task):
+    """
+    Pool worker for images_to_pdf_with_filenames.
+
+    Returns (filename, encoded image, width pt, height pt) for an image fitted into the
+    area above the caption. Small enough JPEGs are passed through byte for byte.
+    """
+    image_path, max_dpi = task
+    with Image.open(image_path) as img:
+        # Scale image to fit A4
+        img_ratio = img.width / img.height
+        a4_ratio = A4_WIDTH / (A4_HEIGHT - CAPTION_HEIGHT)
+
+        if img_ratio > a4_ratio:
+            width, height = A4_WIDTH, A4_WIDTH / img_ratio
+        else:
+            width, height = (A4_HEIGHT - CAPTION_HEIGHT) * img_ratio, A4_HEIGHT - CAPTION_HEIGHT
+
+        max_size = (max(1, int(width * max_dpi / 72)), max(1, int(height * max_dpi / 72)))
+        is_jpeg = img.format == 'JPEG' and img.mode in ('RGB', 'L')
+
+        if is_jpeg and img.width <= max_size[0] and img.height <= max_size[1]:
+            with open(image_path, 'rb') as f:
+                return Path(image_path).name, f.read(), width, height
+
+        if is_jpeg:
+            img.draft(img.mode, max_size)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, 'white')
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        elif img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        if img.width > max_size[0] or img.height > max_size[1]:
+            img = img.resize(max_size, Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        if is_jpeg:
+            img.save(buffer, 'JPEG', quality=95)
+        else:
+            img.save(buffer, 'PNG')
+        return Path(image_path).name, buffer.getvalue(), width, height
+
+def _write_thumbnails(image_path, sizes, output_folder, reducing_gap):
+    """Decode once (JPEGs at the smallest DCT scale the largest box allows) and save every size."""
+    path = Path(image_path)
+    with Image.open(path) as image:
+        largest = (max(w for w, _ in sizes), max(h for _, h in sizes))
+        image.draft(image.mode, largest)
+        image.load()
+
+        output_paths = []
+        for width, height in sizes:
+            thumbnail = image.copy()
+            thumbnail.thumbnail((width, height), Image.LANCZOS, reducing_gap=reducing_gap)
+            output_path = Path(output_folder) / f"{path.stem}_{width}x{height}{path.suffix}"
+            thumbnail.save(output_path)
+            output_paths.append(output_path)
+        return output_paths
+
+def _thumbnail_file(task):
+    """Pool worker for batch_thumbnails; returns (filename, error)."""
+    image_path, sizes, output_folder, reducing_gap = task
+    try:
+        _write_thumbnails(image_path, sizes, output_folder, reducing_gap)
+        return Path(image_path).name, None
+    except Exception as e:
+        return Path(image_path).name, str(e)
+
+def _read_exif_row(task):
+    """Pool worker for extract_data_batch; unreadable files get an 'error' column."""
+    image_path, root = task
+    row = {'file': os.path.relpath(image_path, root)}
+    try:
+        row.update(read_exif(image_path))
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+def _spool_rows(rows, spool):
+    """Pickle rows one after another into spool; returns their columns in first-seen order."""
+    columns = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+        pickle.dump(row, spool, pickle.HIGHEST_PROTOCOL)
+    spool.seek(0)
+    return list(columns)
+
+def _unspool_rows(spool):
+    while True:
+        try:
+            yield pickle.load(spool)
+        except EOFError:
+            return
+
+def _write_parquet(output_path, columns, rows):
+    """Write rows in batches of EXIF_BATCH_ROWS as nullable string columns."""
+    def string_batches():
+        while batch := list(itertools.islice(rows, EXIF_BATCH_ROWS)):
+            yield [[None if row.get(column) is None else str(row[column]) for column in columns] for row in batch]
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        import pandas as pd
+        for index, batch in enumerate(string_batches()):
+            frame = pd.DataFrame(batch, columns=columns, dtype='string')
+            frame.to_parquet(output_path, engine='fastparquet', index=False, append=index > 0)
+        return
+
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for batch in string_batches():
+            arrays = [pa.array(values, pa.string()) for values in zip(*batch)]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+
+def _strip_image_metadata(image_path, output_path):
+    """Rewrite JPEG/PNG containers without metadata; other formats are re-saved by Pillow."""
+    try:
+        strip_metadata(image_path, output_path)
+    except ValueError:
+        with Image.open(image_path) as image:
+            clean = Image.new(image.mode, image.size)
+            clean.paste(image)
+            if image.mode == 'P':
+                clean.putpalette(image.getpalette())
+            clean.save(output_path)
+
+def _strip_image_file(task):
+    """Pool worker for remove_exif_folder; returns (filename, error)."""
+    image_path, output_folder = task
+    path = Path(image_path)
+    try:
+        _strip_image_metadata(path, Path(output_folder) / f"{path.stem}_no_exif{path.suffix}")
+        return path.name, None
+    except Exception as e:
+        return path.name, str(e)
+
+def _pil_format(extension):
+    """Pillow format name for an output extension such as 'jpg' or 'png'."""
+    extension = extension.upper()
+    return 'JPEG' if extension == 'JPG' else extension
+
+def _convert_image_file(task):
+    """Pool worker for batch_convert_format; returns (filename, new_filename, error)."""
+    file_path, output_folder, output_format = task
+    filename = Path(file_path).name
+    new_filename = f"{Path(filename).stem}.{output_format}"
+    try:
+        with Image.open(file_path) as img:
+            img = img.convert("RGB")
+            img.save(Path(output_folder) / new_filename, _pil_format(output_format), quality=100)
+        return filename, new_filename, None
+    except Exception as e:
+        return filename, new_filename, str(e)
+
 # Example of how to use the class (uncomment the following lines to test):
 # if __name__ == "__main__":
 #     handler = ImageHandler()
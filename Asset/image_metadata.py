@@ -0,0 +1,183 @@
+import shutil
+import struct
+
+from PIL import Image, TiffImagePlugin
+from PIL.ExifTags import GPSTAGS, TAGS
+
+JPEG_SOI = b'\xff\xd8'
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# APP1 holds EXIF and XMP, APP13 holds Photoshop/IPTC records
+JPEG_METADATA_MARKERS = {0xE1, 0xED}
+# Markers without a length field: TEM, RST0-RST7, SOI, EOI
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8), 0xD8, 0xD9}
+JPEG_SOS = 0xDA
+
+PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'eXIf'}
+
+EXIF_HEADER = b'Exif\x00\x00'
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+
+
+def strip_metadata(src_path, dst_path):
+    """
+    Copy a JPEG or PNG image to dst_path without its metadata segments.
+
+    Only the container is rewritten: pixel data is never decoded, so everything except
+    the dropped EXIF/XMP/IPTC/text segments is byte-identical. Returns the number of
+    segments removed; raises ValueError for other formats.
+    """
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        header = src.read(8)
+        if header.startswith(JPEG_SOI):
+            src.seek(0)
+            return _strip_jpeg(src, dst)
+        if header == PNG_SIGNATURE:
+            dst.write(header)
+            return _strip_png(src, dst)
+    raise ValueError(f"Unsupported image container: {src_path}")
+
+
+def read_exif(image_path):
+    """
+    Return the EXIF tags of a JPEG or PNG as {tag name: value}.
+
+    Only the EXIF segment is read; other segments and all pixel data are skipped with
+    seeks. Tags from the Exif and GPS sub-IFDs are merged into the result, and values
+    are converted to str/int/float so they can be written to CSV or JSON.
+    """
+    with open(image_path, 'rb') as f:
+        header = f.read(8)
+        if header.startswith(JPEG_SOI):
+            f.seek(2)
+            data = _find_jpeg_exif(f)
+        elif header == PNG_SIGNATURE:
+            data = _find_png_exif(f)
+        else:
+            raise ValueError(f"Unsupported image container: {image_path}")
+
+    if not data:
+        return {}
+
+    exif = Image.Exif()
+    exif.load(data)
+    tags = {}
+    for tag_id, value in exif.items():
+        if tag_id not in (EXIF_IFD_POINTER, GPS_IFD_POINTER):
+            tags[TAGS.get(tag_id, str(tag_id))] = _plain_value(value)
+    for tag_id, value in exif.get_ifd(EXIF_IFD_POINTER).items():
+        tags[TAGS.get(tag_id, str(tag_id))] = _plain_value(value)
+    for tag_id, value in exif.get_ifd(GPS_IFD_POINTER).items():
+        tags[GPSTAGS.get(tag_id, str(tag_id))] = _plain_value(value)
+    return {name: value for name, value in tags.items() if value is not None}
+
+
+def _find_jpeg_exif(f):
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code in JPEG_STANDALONE_MARKERS:
+            continue
+        if code == JPEG_SOS:
+            return None
+        (length,) = struct.unpack('>H', f.read(2))
+        if code == 0xE1:
+            segment = f.read(length - 2)
+            if segment.startswith(EXIF_HEADER):
+                return segment
+        else:
+            f.seek(length - 2, 1)
+
+
+def _find_png_exif(f):
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        (length,) = struct.unpack('>I', chunk_header[:4])
+        chunk_type = chunk_header[4:]
+        if chunk_type == b'eXIf':
+            return f.read(length)
+        if chunk_type == b'IEND':
+            return None
+        f.seek(length + 4, 1)
+
+
+def _plain_value(value):
+    if isinstance(value, TiffImagePlugin.IFDRational):
+        return None if value.denominator == 0 else float(value)
+    if isinstance(value, bytes):
+        # MakerNote and similar binary blobs are not useful as catalog columns
+        text = value.rstrip(b'\x00')
+        return text.decode('ascii') if len(text) <= 64 and text.isascii() else None
+    if isinstance(value, str):
+        return value.rstrip('\x00').strip()
+    if isinstance(value, tuple):
+        return ', '.join(str(_plain_value(v)) for v in value)
+    return value
+
+
+def _strip_jpeg(src, dst):
+    dst.write(src.read(2))
+    removed = 0
+    while True:
+        byte = src.read(1)
+        if not byte:
+            return removed
+        if byte != b'\xff':
+            raise ValueError("Corrupt JPEG: expected a marker")
+
+        marker = src.read(1)
+        while marker == b'\xff':  # fill bytes
+            marker = src.read(1)
+        code = marker[0]
+
+        if code in JPEG_STANDALONE_MARKERS:
+            dst.write(b'\xff' + marker)
+            continue
+        if code == JPEG_SOS:
+            # Entropy-coded data follows; nothing after it is metadata we strip
+            dst.write(b'\xff' + marker)
+            shutil.copyfileobj(src, dst)
+            return removed
+
+        length_bytes = src.read(2)
+        (length,) = struct.unpack('>H', length_bytes)
+        if code in JPEG_METADATA_MARKERS:
+            src.seek(length - 2, 1)
+            removed += 1
+        else:
+            dst.write(b'\xff' + marker + length_bytes)
+            _copy_bytes(src, dst, length - 2)
+
+
+def _strip_png(src, dst):
+    removed = 0
+    while True:
+        chunk_header = src.read(8)
+        if len(chunk_header) < 8:
+            return removed
+        (length,) = struct.unpack('>I', chunk_header[:4])
+        chunk_type = chunk_header[4:]
+
+        if chunk_type in PNG_METADATA_CHUNKS:
+            src.seek(length + 4, 1)  # data + CRC
+            removed += 1
+            continue
+
+        dst.write(chunk_header)
+        _copy_bytes(src, dst, length + 4)
+        if chunk_type == b'IEND':
+            return removed
+
+
+def _copy_bytes(src, dst, count, buffer_size=1024 * 1024):
+    while count > 0:
+        data = src.read(min(count, buffer_size))
+        if not data:
+            raise ValueError("Unexpected end of file")
+        dst.write(data)
+        count -= len(data)
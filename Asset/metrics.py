@@ -0,0 +1,277 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: totals are still written atomically, just not locked
+    fcntl = None
+
+from Asset.progress import OperationCancelled
+from Asset.utils import peak_rss_mb
+
+METRICS_LOG = 'Output/metrics.jsonl'
+METRICS_TOTALS = 'Output/.metrics_totals.json'
+
+# (metric name, record field, help text) for the summed Prometheus counters
+PROM_COUNTERS = (
+    ('taskmaster_operation_seconds_total', 'wall_seconds', 'Wall-clock time spent in handler operations'),
+    ('taskmaster_operation_cpu_seconds_total', 'cpu_seconds', 'CPU time of handler operations, workers included'),
+    ('taskmaster_operation_bytes_read_total', 'bytes_read', 'Input bytes handed to handler operations'),
+    ('taskmaster_operation_bytes_written_total', 'bytes_written', 'Output bytes written by handler operations'),
+    ('taskmaster_operation_items_total', 'items', 'Items (pages, images, rows) processed'),
+)
+
+_current = contextvars.ContextVar('taskmaster_metrics_record', default=None)
+_logger = None
+
+
+def metrics_enabled():
+    return os.environ.get('TASKMASTER_METRICS', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def enable_metrics(enabled=True, prometheus_path=None):
+    """Turn metrics on or off for this process and any workers it starts."""
+    os.environ['TASKMASTER_METRICS'] = '1' if enabled else '0'
+    if prometheus_path:
+        os.environ['TASKMASTER_METRICS_PROM'] = str(prometheus_path)
+
+
+def add_items(count):
+    """Count items (pages, images, rows) against the running instrumented operation."""
+    record = _current.get()
+    if record is not None:
+        record['items'] = (record['items'] or 0) + count
+
+
+@contextmanager
+def phase(name):
+    """Time a phase (decode, transform, encode, save, ...) of the running instrumented operation."""
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases = record['phases']
+        phases[name] = round(phases.get(name, 0.0) + time.perf_counter() - start, 6)
+
+
+def _cpu_seconds():
+    # Children are counted once they have been waited on, i.e. after a pool shuts down
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _worker_peak_rss_mb():
+    """Largest peak RSS among finished worker processes, in MB."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _input_stats(path):
+    """(bytes, files) of an input file, or of the files directly inside an input folder."""
+    try:
+        if not os.path.isdir(path):
+            return os.path.getsize(path), 1
+        size = files = 0
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    size += entry.stat().st_size
+                    files += 1
+        return size, files
+    except OSError:
+        return 0, 0
+
+
+def _bytes_written(folder):
+    """
+    Total size of the files under folder, leaving out log and metrics files.
+
+    Handlers run under tracked, which hands them a private staging folder, so everything
+    in it was written by the current call.
+    """
+    skipped = ('log.log', os.path.basename(METRICS_LOG))
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name not in skipped:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+    return total
+
+
+def _metrics_logger():
+    """JSON-lines logger writing to Output/metrics.jsonl, separate from the free-text log."""
+    global _logger
+    if _logger is None:
+        Path(METRICS_LOG).parent.mkdir(parents=True, exist_ok=True)
+        _logger = logging.getLogger('taskmaster.metrics')
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        handler = logging.FileHandler(METRICS_LOG)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _logger.addHandler(handler)
+    return _logger
+
+
+def emit(record):
+    """Log one record as JSON and fold it into the totals behind the Prometheus output."""
+    _metrics_logger().info(json.dumps(record, default=str))
+    totals = _update_totals(record)
+    prometheus_path = os.environ.get('TASKMASTER_METRICS_PROM')
+    if prometheus_path:
+        write_textfile(prometheus_path, totals)
+
+
+def _update_totals(record):
+    """Fold one record into the cross-process running totals and return them."""
+    totals_path = Path(METRICS_TOTALS)
+    totals_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(totals_path.with_suffix('.lock'), 'w') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            totals = load_totals()
+            key = f"{record['operation']}|{record['status']}"
+            entry = totals.setdefault(key, {'count': 0, 'peak_rss_mb': 0.0})
+            entry['count'] += 1
+            for _, field, _ in PROM_COUNTERS:
+                entry[field] = entry.get(field, 0) + (record[field] or 0)
+            entry['peak_rss_mb'] = max(entry['peak_rss_mb'], record['peak_rss_mb'] or 0.0)
+            for name, seconds in record['phases'].items():
+                phases = entry.setdefault('phases', {})
+                phases[name] = phases.get(name, 0.0) + seconds
+
+            fd, temp_path = tempfile.mkstemp(dir=totals_path.parent, suffix='.json')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(totals, f)
+            os.replace(temp_path, totals_path)
+            return totals
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def load_totals():
+    try:
+        with open(METRICS_TOTALS) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def render_prometheus(totals):
+    """Prometheus text exposition of the running totals."""
+    lines = [
+        '# HELP taskmaster_operations_total Handler operations run',
+        '# TYPE taskmaster_operations_total counter',
+    ]
+    labelled = []
+    for key in sorted(totals):
+        operation, status = key.split('|')
+        labelled.append((f'operation="{operation}",status="{status}"', totals[key]))
+    lines += [f'taskmaster_operations_total{{{labels}}} {entry["count"]}' for labels, entry in labelled]
+
+    for name, field, help_text in PROM_COUNTERS:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        lines += [f'{name}{{{labels}}} {entry.get(field, 0)}' for labels, entry in labelled]
+
+    lines += ['# HELP taskmaster_operation_phase_seconds_total Time spent per operation phase',
+              '# TYPE taskmaster_operation_phase_seconds_total counter']
+    for labels, entry in labelled:
+        for phase_name, seconds in sorted(entry.get('phases', {}).items()):
+            lines.append(f'taskmaster_operation_phase_seconds_total{{{labels},phase="{phase_name}"}} {seconds:.6f}')
+
+    lines += ['# HELP taskmaster_operation_peak_rss_megabytes Highest peak RSS seen per operation',
+              '# TYPE taskmaster_operation_peak_rss_megabytes gauge']
+    lines += [f'taskmaster_operation_peak_rss_megabytes{{{labels}}} {entry["peak_rss_mb"]}'
+              for labels, entry in labelled]
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path, totals=None):
+    """Atomically write the totals as a node_exporter textfile-collector .prom file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.prom.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(render_prometheus(load_totals() if totals is None else totals))
+    os.replace(temp_path, path)
+
+
+def instrumented(operation):
+    """
+    Record wall time, CPU time, bytes read and written, items and peak RSS for a handler method.
+
+    The method's first parameter is its input file or folder and it must take an
+    output_folder keyword, as for cached. Each call emits one JSON record to
+    Output/metrics.jsonl while metrics are enabled; handlers add detail with
+    add_items() and phase().
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        input_name = next(iter(signature.parameters))
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics_enabled() or _current.get() is not None:
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            input_path = bound.arguments[input_name]
+            bytes_read, input_files = _input_stats(input_path)
+            record = {
+                'operation': operation,
+                'input': str(input_path),
+                'status': 'ok',
+                'items': None,
+                'phases': {},
+            }
+            token = _current.set(record)
+            start_time = time.time()
+            start_wall = time.perf_counter()
+            start_cpu = _cpu_seconds()
+            try:
+                return func(*args, **kwargs)
+            except OperationCancelled:
+                record['status'] = 'cancelled'
+                raise
+            except Exception:
+                record['status'] = 'error'
+                raise
+            finally:
+                _current.reset(token)
+                record['wall_seconds'] = round(time.perf_counter() - start_wall, 6)
+                record['cpu_seconds'] = round(_cpu_seconds() - start_cpu, 6)
+                record['bytes_read'] = bytes_read
+                record['bytes_written'] = _bytes_written(bound.arguments['output_folder'])
+                if record['items'] is None:
+                    record['items'] = input_files
+                record['peak_rss_mb'] = round(max(peak_rss_mb() or 0.0, _worker_peak_rss_mb()), 1)
+                record['timestamp'] = round(start_time, 3)
+                try:
+                    emit(record)
+                except OSError as e:
+                    logging.warning(f"Could not write metrics for {operation}: {e}")
+
+        return wrapper
+    return decorator
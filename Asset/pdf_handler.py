@@ -1,122 +1,546 @@
 import os  # Ensure os is imported
 from pathlib import Path  # Import pathlib for path handling
+import hashlib
+import io
 import logging
+import tempfile
+import time
 import pikepdf  
-import img2pdf
-from PIL import Image
+from Asset import progress
+from Asset.cache import cached
+from Asset.discovery import discover, discover_names
+from Asset.metrics import add_items, instrumented, phase
+from Asset.progress import OperationCancelled, tracked
+from Asset.utils import bounded_map, parallel_map, peak_rss_mb
 
 class PDFHandler:
     @staticmethod
-    def split(pdf_path):
+    @tracked('Splitting PDF')
+    @instrumented('pdf.split')
+    @cached('pdf.split')
+    def split(pdf_path, output_folder='Output/split_pdfs', pages_per_file=1, ranges=None, workers=None):
+        """
+        Split a PDF into <stem>_page_<n>.pdf files.
+
+        pages_per_file groups consecutive pages into one output, and ranges (e.g. "1-3,5,8-")
+        selects explicit page ranges instead; multi-page outputs are named <stem>_page_<a>-<b>.pdf.
+        Page ranges are sharded across `workers` processes, each of which opens the source once.
+        """
         try:
-            output_folder = Path('Output/split_pdfs')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
-            pdf = pikepdf.Pdf.open(pdf_path)
-            for i, page in enumerate(pdf.pages):
-                new_pdf = pikepdf.Pdf.new()
-                new_pdf.pages.append(page)
-                output_path = output_folder / f"{Path(pdf_path).stem}_page_{i + 1}.pdf"
-                new_pdf.save(output_path)
+            with pikepdf.Pdf.open(pdf_path) as pdf:
+                page_count = len(pdf.pages)
+
+            if ranges:
+                chunks = _parse_page_ranges(ranges, page_count)
+            else:
+                step = max(1, int(pages_per_file))
+                chunks = [(first, min(first + step - 1, page_count)) for first in range(1, page_count + 1, step)]
+
+            workers = workers or os.cpu_count() or 1
+            # Keep at least a few dozen pages per shard so small files don't pay for a pool
+            shard_count = max(1, min(workers, len(chunks), page_count // 25))
+            shards = [chunks[index::shard_count] for index in range(shard_count)]
+            tasks = [(str(pdf_path), str(output_folder), shard) for shard in shards]
+
+            progress.start(len(chunks), 'files')
+            file_count = 0
+            with phase('write'):
+                for count in parallel_map(_split_shard, tasks, shard_count):
+                    file_count += count
+                    progress.advance(count)
+            add_items(page_count)
             
-            logging.info(f"PDF split into {len(pdf.pages)} files.")
+            logging.info(f"PDF split into {file_count} files.")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error splitting PDF: {e}")
             raise
 
     @staticmethod
-    def merge(folder_path):
+    @tracked('Merging PDFs')
+    @instrumented('pdf.merge')
+    @cached('pdf.merge')
+    def merge(folder_path, output_folder='Output', batch_size=None, recursive=False, include=None, exclude=None):
+        """
+        Merge every PDF in folder_path into <output_folder>/merged.pdf, in natural name order.
+
+        recursive, include and exclude select the inputs as in Asset.discovery.discover.
+
+        With batch_size set, at most that many source PDFs are held open at once: files are
+        merged in batches into intermediate PDFs, which are merged again until one remains.
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
-            pdf_files = sorted([f for f in os.listdir(folder_path) if f.endswith('.pdf')])
+            pdf_files = list(discover_names(folder_path, '.pdf', recursive, include, exclude))
             
             if not pdf_files:
                 raise ValueError("No PDF files found in the specified folder")
 
-            merged_pdf = pikepdf.Pdf.new()
-            
-            for filename in pdf_files:
-                file_path = Path(folder_path) / filename
-                try:
-                    pdf = pikepdf.Pdf.open(file_path)
-                    merged_pdf.pages.extend(pdf.pages)
-                except Exception as e:
-                    logging.warning(f"Skipping {filename} due to error: {e}")
-                    continue
-
-            if len(merged_pdf.pages) > 0:
-                output_path = output_folder / "merged.pdf"
-                merged_pdf.save(output_path)
+            start = time.perf_counter()
+            output_path = output_folder / "merged.pdf"
+            file_paths = [Path(folder_path) / filename for filename in pdf_files]
+            progress.start(len(file_paths), 'files')
+
+            with phase('merge'), progress.failures() as skipped:
+                if batch_size and batch_size > 1:
+                    page_count = _merge_hierarchically(file_paths, output_path, batch_size)
+                else:
+                    page_count = _merge_batch(file_paths, output_path)
+            add_items(page_count)
+
+            if page_count > 0:
+                elapsed = time.perf_counter() - start
+                rate = page_count / elapsed if elapsed > 0 else float('inf')
+                peak = peak_rss_mb()
+                peak_text = f", peak RSS {peak:.0f} MB" if peak is not None else ""
                 logging.info(f"PDFs merged successfully. Output saved to {output_path}")
-                return True
+                logging.info(f"Merged {page_count} pages in {elapsed:.2f}s ({rate:.1f} pages/s{peak_text})")
+                if skipped:
+                    logging.warning(f"{len(skipped)} unreadable PDF(s) were left out of {output_path}")
+                return not skipped
             else:
                 raise ValueError("No valid PDF pages found to merge")
                 
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error merging PDFs: {e}")
             raise
 
     @staticmethod
-    def remove_blank(pdf_path):
+    @tracked('Removing blank pages')
+    @instrumented('pdf.remove_blank')
+    @cached('pdf.remove_blank')
+    def remove_blank(pdf_path, output_folder='Output', ink_threshold=0.005, white_level=220, workers=None):
+        """
+        Drop blank pages, including scanned pages that only carry specks of noise.
+
+        A page is blank when its content draws nothing but invisible text, white fills and
+        strokes, and images in which the share of pixels darker than white_level (0-255) is at
+        most ink_threshold. Images are
+        inspected at roughly 100 DPI; pages are checked in parallel across `workers` processes.
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
             pdf = pikepdf.Pdf.open(pdf_path)
+            page_count = len(pdf.pages)
+
+            workers = workers or os.cpu_count() or 1
+            shard_count = max(1, min(workers, page_count // 25))
+            tasks = [(str(pdf_path), list(range(index, page_count, shard_count)), ink_threshold, white_level)
+                     for index in range(shard_count)]
+            blank_pages = set()
+            progress.start(page_count, 'pages')
+            with phase('detect'):
+                for task, shard_blanks in zip(tasks, parallel_map(_find_blank_pages, tasks, shard_count)):
+                    blank_pages.update(shard_blanks)
+                    progress.advance(len(task[1]))
+
             new_pdf = pikepdf.Pdf.new()
-            
-            for page in pdf.pages:
-                if not page.is_blank:
+            for index, page in enumerate(pdf.pages):
+                if index not in blank_pages:
                     new_pdf.pages.append(page)
 
             output_path = output_folder / f"{Path(pdf_path).stem}_no_blanks.pdf"
-            new_pdf.save(output_path)
+            with phase('save'):
+                new_pdf.save(output_path)
+            add_items(page_count)
 
+            logging.info(f"Removed {len(blank_pages)} of {page_count} pages as blank")
             logging.info(f"Blank pages removed successfully. Output saved to {output_path}")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error removing blank pages: {e}")
             raise
 
     @staticmethod
-    def compress_pdf(pdf_path):
+    @tracked('Compressing PDF')
+    @instrumented('pdf.compress_pdf')
+    @cached('pdf.compress_pdf')
+    def compress_pdf(pdf_path, output_folder='Output', target_dpi=150, jpeg_quality=80, workers=None):
+        """
+        Compress a PDF by recompressing its images and then its streams.
+
+        Identical image streams are deduplicated across pages, RGB/gray images above
+        target_dpi (measured against the page width) are downsampled, and images are
+        re-encoded as JPEG at jpeg_quality in a pool of `workers` processes. A re-encoded
+        image is only kept when it is smaller. Workers receive the still-compressed streams
+        and each result is written back as it arrives, so memory does not grow with the
+        number of images. Pass jpeg_quality=None for the lossless stream-only compression.
+        """
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
+            start = time.perf_counter()
             pdf = pikepdf.Pdf.open(pdf_path)
             output_path = output_folder / f"{Path(pdf_path).stem}_compressed.pdf"
+
+            if jpeg_quality is not None:
+                with phase('decode'):
+                    images, duplicates = _collect_images(pdf)
+                # Tasks carry the still-compressed stream and are built only as workers free
+                # up, and each result is written back as it arrives, so only a few images are
+                # held in memory at once
+                tasks = ((key, *_image_payload(obj), _downscale_factor(obj, width_in, target_dpi), jpeg_quality)
+                         for key, (obj, width_in) in images.items())
+                replaced = 0
+                progress.start(len(images), 'images')
+                with phase('encode'):
+                    for key, data, width, height, mode in bounded_map(_recompress_image, tasks, workers):
+                        progress.advance()
+                        obj = images[key][0]
+                        if data is not None and len(data) < len(obj.read_raw_bytes()):
+                            obj.write(data, filter=pikepdf.Name.DCTDecode)
+                            obj.Width, obj.Height, obj.BitsPerComponent = width, height, 8
+                            obj.ColorSpace = pikepdf.Name.DeviceRGB if mode == 'RGB' else pikepdf.Name.DeviceGray
+                            if '/DecodeParms' in obj:
+                                del obj['/DecodeParms']
+                            replaced += 1
+                logging.info(f"Recompressed {replaced} of {len(images)} images, "
+                             f"removed {duplicates} duplicate image streams")
             
-            pdf.save(output_path, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+            with phase('save'):
+                pdf.save(output_path, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+            add_items(len(pdf.pages))
 
+            original_size = os.path.getsize(pdf_path)
+            new_size = os.path.getsize(output_path)
+            logging.info(f"Compressed {Path(pdf_path).name}: {original_size / 1024:.0f} KB -> "
+                         f"{new_size / 1024:.0f} KB ({100 * new_size / max(original_size, 1):.0f}%) "
+                         f"in {time.perf_counter() - start:.2f}s")
             logging.info(f"PDF compressed successfully. Output saved to {output_path}")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error compressing PDF: {e}")
             raise
 
     @staticmethod
-    def images_to_pdf(image_folder):
+    @tracked('Converting images to PDF')
+    @instrumented('pdf.images_to_pdf')
+    @cached('pdf.images_to_pdf')
+    def images_to_pdf(image_folder, output_folder='Output', recursive=False, include=None, exclude=None):
         try:
-            output_folder = Path('Output')
+            output_folder = Path(output_folder)
             output_folder.mkdir(parents=True, exist_ok=True)
             
-            image_files = []
-            for ext in ('*.jpg', '*.jpeg', '*.png'):
-                image_files.extend(Path(image_folder).glob(ext))
+            image_files = [entry.path for entry in discover(image_folder, ('.jpg', '.jpeg', '.png'), recursive,
+                                                            include, exclude)]
             
             if not image_files:
                 raise ValueError("No image files found in the specified folder")
 
+            import img2pdf
+
             output_path = output_folder / "images_combined.pdf"
-            with open(output_path, "wb") as f:
-                f.write(img2pdf.convert([str(img) for img in sorted(image_files)]))
+            with phase('encode'):
+                data = img2pdf.convert(image_files)
+            with phase('save'), open(output_path, "wb") as f:
+                f.write(data)
+            add_items(len(image_files))
 
             logging.info(f"Images converted to PDF successfully. Output saved to {output_path}")
             return True
+        except OperationCancelled:
+            raise
         except Exception as e:
             logging.error(f"Error converting images to PDF: {e}")
             raise
+
+
+def _parse_page_ranges(ranges, page_count):
+    """Turn "1-3,5,8-" (or a list of (first, last) tuples) into 1-based inclusive page ranges."""
+    if isinstance(ranges, str):
+        parsed = []
+        for part in ranges.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            first, sep, last = part.partition('-')
+            first = int(first) if first.strip() else 1
+            last = (int(last) if last.strip() else page_count) if sep else first
+            parsed.append((first, last))
+        ranges = parsed
+
+    chunks = []
+    for first, last in ranges:
+        if not 1 <= first <= last <= page_count:
+            raise ValueError(f"Invalid page range {first}-{last} for a {page_count}-page PDF")
+        chunks.append((first, last))
+    return chunks
+
+
+def _split_shard(task):
+    """Pool worker for split: write each (first, last) range of one shard; returns the file count."""
+    pdf_path, output_folder, chunks = task
+    stem = Path(pdf_path).stem
+    with pikepdf.Pdf.open(pdf_path) as pdf:
+        for first, last in chunks:
+            new_pdf = pikepdf.Pdf.new()
+            new_pdf.pages.extend(pdf.pages[first - 1:last])
+            suffix = f"{first}" if first == last else f"{first}-{last}"
+            new_pdf.save(Path(output_folder) / f"{stem}_page_{suffix}.pdf")
+            new_pdf.close()
+    return len(chunks)
+
+
+# Content stream operators that put text, vector art or inline images on the page
+TEXT_OPERATORS = {'Tj', 'TJ', "'", '"'}
+FILL_OPERATORS = {'f', 'F', 'f*'}
+STROKE_OPERATORS = {'S', 's'}
+PAINT_OPERATORS = {'B', 'B*', 'b', 'b*', 'sh', 'BI', 'INLINE IMAGE'}
+FILL_COLOUR_OPERATORS = {'g', 'rg', 'k', 'cs', 'sc', 'scn'}
+STROKE_COLOUR_OPERATORS = {'G', 'RG', 'K', 'CS', 'SC', 'SCN'}
+# Text render modes that draw nothing: 3 is invisible, 7 only adds to the clipping path
+INVISIBLE_TEXT_MODES = {3, 7}
+BLANK_CHECK_DPI = 100
+
+
+def _find_blank_pages(task):
+    """Pool worker for remove_blank: returns the indices of blank pages among page_indices."""
+    pdf_path, page_indices, ink_threshold, white_level = task
+    blank = []
+    with pikepdf.Pdf.open(pdf_path) as pdf:
+        for index in page_indices:
+            try:
+                if _is_blank_page(pdf.pages[index], ink_threshold, white_level):
+                    blank.append(index)
+            except Exception as e:
+                logging.warning(f"Keeping page {index + 1} of {Path(pdf_path).name}: {e}")
+    return blank
+
+
+def _is_blank_page(page, ink_threshold, white_level):
+    """
+    True when page draws nothing but invisible text, white fills and strokes, and images
+    with at most ink_threshold ink. Colours set through a colour space (cs/sc/scn) count as ink.
+    """
+    xobjects = page.resources.get('/XObject', {})
+    images = []
+    fill_white = stroke_white = False
+    render_mode = 0
+    saved = []
+    for operands, operator in pikepdf.parse_content_stream(page):
+        operator = str(operator)
+        if operator == 'q':
+            saved.append((fill_white, stroke_white, render_mode))
+        elif operator == 'Q' and saved:
+            fill_white, stroke_white, render_mode = saved.pop()
+        elif operator in FILL_COLOUR_OPERATORS:
+            fill_white = _is_white(operator, operands)
+        elif operator in STROKE_COLOUR_OPERATORS:
+            stroke_white = _is_white(operator.lower(), operands)
+        elif operator == 'Tr':
+            render_mode = int(operands[0])
+        elif operator in TEXT_OPERATORS:
+            if render_mode not in INVISIBLE_TEXT_MODES:
+                return False
+        elif operator in FILL_OPERATORS:
+            if not fill_white:
+                return False
+        elif operator in STROKE_OPERATORS:
+            if not stroke_white:
+                return False
+        elif operator in PAINT_OPERATORS:
+            return False
+        elif operator == 'Do':
+            xobject = xobjects.get(operands[0])
+            if xobject is None or xobject.get('/Subtype') != '/Image':
+                # Form XObjects can draw anything, so treat them as content
+                return False
+            images.append(xobject)
+
+    page_width_in = float(page.mediabox[2] - page.mediabox[0]) / 72
+    return all(_ink_coverage(image, page_width_in, white_level) <= ink_threshold for image in images)
+
+
+def _is_white(operator, operands):
+    """True when a g, rg or k colour operator sets pure white."""
+    white = {'g': [1.0], 'rg': [1.0, 1.0, 1.0], 'k': [0.0, 0.0, 0.0, 0.0]}.get(operator)
+    return white is not None and [float(value) for value in operands] == white
+
+
+def _ink_coverage(image_obj, page_width_in, white_level):
+    """Fraction of pixels darker than white_level, measured on a ~100 DPI grayscale copy."""
+    import numpy as np
+    from PIL import Image
+
+    pdf_image = pikepdf.PdfImage(image_obj)
+    factor = max(1, int(pdf_image.width / max(page_width_in, 1) // BLANK_CHECK_DPI))
+
+    if pdf_image.filters == ['/DCTDecode']:
+        # Let libjpeg scale in the DCT domain instead of decoding at full resolution
+        image = Image.open(io.BytesIO(image_obj.read_raw_bytes()))
+        image.draft('L', (pdf_image.width // factor, pdf_image.height // factor))
+        image = image.convert('L')
+    else:
+        image = pdf_image.as_pil_image().convert('L')
+        if factor > 1:
+            image = image.reduce(factor)
+
+    pixels = np.asarray(image)
+    return np.count_nonzero(pixels < white_level) / max(pixels.size, 1)
+
+
+def _collect_images(pdf):
+    """
+    Find the recompressible images in pdf, pointing pages at one copy of identical streams.
+
+    Returns ({key: (image object, widest page width in inches)}, duplicates removed).
+    """
+    images, canonical, duplicates = {}, {}, 0
+    for page in pdf.pages:
+        width_in = float(page.mediabox[2] - page.mediabox[0]) / 72
+        xobjects = page.resources.get('/XObject', {})
+        for name in list(xobjects.keys()):
+            obj = xobjects[name]
+            if obj.get('/Subtype') != '/Image' or not _can_recompress(obj):
+                continue
+            digest = hashlib.sha256(obj.read_raw_bytes())
+            digest.update(repr(sorted((k, str(v)) for k, v in obj.items() if k != '/Length')).encode())
+            key = digest.hexdigest()
+            if key in canonical:
+                if canonical[key].objgen != obj.objgen:
+                    xobjects[name] = canonical[key]
+                    duplicates += 1
+                previous = images[key][1]
+                images[key] = (canonical[key], max(previous, width_in))
+            else:
+                canonical[key] = obj
+                images[key] = (obj, width_in)
+    return images, duplicates
+
+
+def _can_recompress(obj):
+    """Plain 8-bit RGB/gray images without masks, decode arrays or exotic filters."""
+    filters = obj.get('/Filter')
+    filters = [str(f) for f in filters] if isinstance(filters, pikepdf.Array) else [str(filters)] if filters else []
+    return (
+        obj.get('/BitsPerComponent') == 8
+        and str(obj.get('/ColorSpace')) in ('/DeviceRGB', '/DeviceGray')
+        and not any(k in obj for k in ('/SMask', '/Mask', '/ImageMask', '/Decode'))
+        and filters in ([], ['/FlateDecode'], ['/DCTDecode'])
+        and min(int(obj.Width), int(obj.Height)) >= 16
+    )
+
+
+def _image_payload(obj):
+    """
+    Picklable (raw stream bytes, filter, decode parms, mode, size) for a pool worker.
+
+    The stream is passed still compressed and decoded by the worker.
+    """
+    mode = 'RGB' if str(obj.ColorSpace) == '/DeviceRGB' else 'L'
+    size = (int(obj.Width), int(obj.Height))
+    filters = obj.get('/Filter')
+    filters = [str(f) for f in filters] if isinstance(filters, pikepdf.Array) else [str(filters)] if filters else []
+    parms = obj.get('/DecodeParms')
+    if isinstance(parms, pikepdf.Array):
+        parms = parms[0] if len(parms) else None
+    parms = {str(name): int(value) for name, value in parms.items()} if isinstance(parms, pikepdf.Dictionary) else None
+    return obj.read_raw_bytes(), filters[0] if filters else None, parms, mode, size
+
+
+def _decode_flate(data, parms):
+    """Inflate a FlateDecode image stream, undoing any predictor, as pikepdf would."""
+    with pikepdf.new() as scratch:
+        stream = pikepdf.Stream(scratch, data)
+        stream.Filter = pikepdf.Name.FlateDecode
+        if parms:
+            stream.DecodeParms = pikepdf.Dictionary(parms)
+        return stream.read_bytes()
+
+
+def _downscale_factor(obj, width_in, target_dpi):
+    if not target_dpi or width_in <= 0:
+        return 1.0
+    return min(1.0, target_dpi * width_in / int(obj.Width))
+
+
+def _recompress_image(task):
+    """Pool worker for compress_pdf: returns (key, jpeg bytes or None, width, height, mode)."""
+    from PIL import Image
+
+    key, data, stream_filter, parms, mode, size, scale, quality = task
+    try:
+        new_size = (max(1, round(size[0] * scale)), max(1, round(size[1] * scale)))
+        if stream_filter == '/DCTDecode':
+            image = Image.open(io.BytesIO(data))
+            image.draft(mode, new_size)
+            image = image.convert(mode)
+        else:
+            if stream_filter == '/FlateDecode':
+                data = _decode_flate(data, parms)
+            image = Image.frombytes(mode, size, data)
+        if image.size != new_size:
+            image = image.resize(new_size, Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=quality, optimize=True)
+        return key, buffer.getvalue(), new_size[0], new_size[1], mode
+    except Exception as e:
+        logging.warning(f"Leaving an image unchanged: {e}")
+        return key, None, size[0], size[1], mode
+
+
+def _merge_batch(file_paths, output_path, skip_invalid=True):
+    """Merge file_paths into output_path; returns the page count (nothing is written for 0)."""
+    merged_pdf = pikepdf.Pdf.new()
+    # Sources must stay open until save: pikepdf copies page streams lazily
+    sources = []
+    try:
+        for file_path in file_paths:
+            try:
+                pdf = pikepdf.Pdf.open(file_path)
+            except Exception as e:
+                if not skip_invalid:
+                    raise
+                logging.warning(f"Skipping {Path(file_path).name} due to error: {e}")
+                progress.fail(file_path)
+                progress.advance()
+                continue
+            sources.append(pdf)
+            merged_pdf.pages.extend(pdf.pages)
+            if skip_invalid:  # only original inputs count, not intermediate parts
+                progress.advance()
+
+        page_count = len(merged_pdf.pages)
+        if page_count > 0:
+            merged_pdf.save(output_path)
+        return page_count
+    finally:
+        for pdf in sources:
+            pdf.close()
+        merged_pdf.close()
+
+
+def _merge_hierarchically(file_paths, output_path, batch_size):
+    """Merge in rounds of batch_size files through intermediate PDFs; returns the page count."""
+    with tempfile.TemporaryDirectory(prefix='merge_', dir=Path(output_path).parent) as temp_dir:
+        level, skip_invalid = 0, True
+        while len(file_paths) > batch_size:
+            next_level = []
+            for index in range(0, len(file_paths), batch_size):
+                part_path = Path(temp_dir) / f"level{level}_{index // batch_size:06d}.pdf"
+                if _merge_batch(file_paths[index:index + batch_size], part_path, skip_invalid):
+                    next_level.append(part_path)
+            # Only the original inputs may be skipped; intermediate files are our own
+            file_paths, level, skip_invalid = next_level, level + 1, False
+            # Drop parts of the previous round that have been folded into this one
+            for stale in Path(temp_dir).glob(f"level{level - 2}_*.pdf"):
+                stale.unlink()
+
+        return _merge_batch(file_paths, output_path, skip_invalid)
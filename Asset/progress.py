@@ -0,0 +1,321 @@
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROGRESS_MODES = ('tqdm', 'lines', 'off')
+# Prefix of the hidden folder inside output_folder that a tracked call writes to
+STAGING_PREFIX = '.partial-'
+
+_reporter = contextvars.ContextVar('taskmaster_progress', default=None)
+_token = contextvars.ContextVar('taskmaster_cancel_token', default=None)
+# (staging folder, final folder) pairs of the running call, innermost first
+_staged = contextvars.ContextVar('taskmaster_staged_folders', default=())
+_failures = contextvars.ContextVar('taskmaster_failed_inputs', default=None)
+
+
+class OperationCancelled(Exception):
+    """Raised inside a handler when its job was cancelled; partial outputs are removed."""
+
+
+class CancelToken:
+    """Thread-safe flag that asks running handler operations to stop at their next checkpoint."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+def progress_mode():
+    """tqdm for an interactive terminal, throughput lines otherwise; TASKMASTER_PROGRESS overrides."""
+    mode = os.environ.get('TASKMASTER_PROGRESS', '').lower()
+    if mode in PROGRESS_MODES:
+        return mode
+    return 'tqdm' if sys.stderr.isatty() else 'lines'
+
+
+def set_progress_mode(mode):
+    """Choose how progress is rendered in this process and any workers it starts."""
+    if mode not in PROGRESS_MODES:
+        raise ValueError(f"Unknown progress mode: {mode}")
+    os.environ['TASKMASTER_PROGRESS'] = mode
+
+
+class ProgressReporter:
+    """
+    Counts the work units a handler reports and renders them.
+
+    In 'tqdm' mode a progress bar is drawn on stderr; in 'lines' mode a throughput line
+    is written to stderr at most every `interval` seconds and once at the end.
+    """
+
+    def __init__(self, description, mode=None, interval=5.0):
+        self.description = description
+        self.mode = mode or progress_mode()
+        self.interval = interval
+        self.total = None
+        self.unit = 'items'
+        self.done = 0
+        self.started = time.perf_counter()
+        self._last_line = self.started
+        self._bar = None
+
+    def start(self, total, unit):
+        self.total = total
+        self.unit = unit
+        if self.mode == 'tqdm':
+            from tqdm import tqdm
+
+            if self._bar is not None:
+                self._bar.close()
+            self._bar = tqdm(total=total, unit=f" {unit}", desc=self.description, ncols=100,
+                             initial=self.done, file=sys.stderr, leave=False)
+
+    def advance(self, count):
+        self.done += count
+        if self._bar is not None:
+            self._bar.update(count)
+        elif self.mode == 'lines':
+            now = time.perf_counter()
+            if now - self._last_line >= self.interval:
+                self._last_line = now
+                print(self._line(now), file=sys.stderr, flush=True)
+
+    def _line(self, now):
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        line = f"{self.description}: {self.done}"
+        if self.total:
+            line += f"/{self.total} {self.unit} ({100 * self.done / self.total:.0f}%)"
+            if rate > 0 and self.done < self.total:
+                line += f", ETA {max(0, self.total - self.done) / rate:.0f}s"
+        else:
+            line += f" {self.unit}"
+        return line + f", {rate:.1f} {self.unit}/s"
+
+    def close(self, status='done'):
+        if self._bar is not None:
+            self._bar.close()
+            self._bar = None
+        now = time.perf_counter()
+        if self.mode != 'off' and self.done:
+            if self.mode == 'lines':
+                print(f"{self._line(now)} [{status}]", file=sys.stderr, flush=True)
+            logging.info(f"{self.description} {status}: {self.done} {self.unit} in {now - self.started:.2f}s")
+
+
+def start(total, unit='items'):
+    """Announce how many units (pages, images, rows, files) the running operation will process."""
+    reporter = _reporter.get()
+    if reporter is not None:
+        reporter.start(total, unit)
+
+
+def advance(count=1):
+    """Report finished units; also a cancellation checkpoint."""
+    check_cancelled()
+    reporter = _reporter.get()
+    if reporter is not None:
+        reporter.advance(count)
+
+
+def fail(name):
+    """Record an input the running operation could not process; see failures()."""
+    collected = _failures.get()
+    if collected is not None:
+        collected.append(str(name))
+
+
+@contextmanager
+def failures():
+    """Collect the inputs that handler calls inside the block report through fail()."""
+    collected = []
+    outer = _failures.get()
+    reset = _failures.set(collected)
+    try:
+        yield collected
+    finally:
+        _failures.reset(reset)
+        # An enclosing failures() block sees them too
+        if outer is not None:
+            outer.extend(collected)
+
+
+def check_cancelled():
+    """Raise OperationCancelled when the running operation's token was cancelled."""
+    token = _token.get()
+    if token is not None and token.cancelled:
+        raise OperationCancelled("Operation cancelled")
+
+
+@contextmanager
+def cancellation(token):
+    """Run the enclosed handler calls under token, so token.cancel() stops them early."""
+    reset = _token.set(token)
+    try:
+        yield token
+    finally:
+        _token.reset(reset)
+
+
+@contextmanager
+def _cancel_on_interrupt(token):
+    """First Ctrl+C cancels cooperatively; a second one interrupts as usual."""
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def handler(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        token.cancel()
+        print("\nCancelling... (press Ctrl+C again to abort immediately)", file=sys.stderr, flush=True)
+
+    previous = signal.signal(signal.SIGINT, handler)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def _final_text(text):
+    for staging_dir, output_folder in _staged.get():
+        text = text.replace(staging_dir, output_folder)
+    return text
+
+
+class _FinalPathsFilter(logging.Filter):
+    """Rewrites staging folders in log records to the folders their files end up in."""
+
+    def filter(self, record):
+        if _staged.get():
+            record.msg = _final_text(record.getMessage())
+            record.args = None
+        return True
+
+
+class _FinalPathsStream:
+    """Wraps stdout so printed paths name the final output folder, not the staging one."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        return self._stream.write(_final_text(text))
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextmanager
+def final_paths(staging_dir, output_folder):
+    """
+    While a handler writes into staging_dir, show output_folder in its log lines and prints.
+
+    Handlers only see the staging folder, but users should see where the files end up.
+    """
+    staging_dir, output_folder = os.fspath(staging_dir), os.fspath(output_folder)
+    pairs = ((staging_dir, output_folder), (os.path.abspath(staging_dir), os.path.abspath(output_folder)))
+    reset = _staged.set(pairs + _staged.get())
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, _FinalPathsFilter) for f in handler.filters):
+            handler.addFilter(_FinalPathsFilter())
+    stdout = sys.stdout
+    wrapped = not isinstance(stdout, _FinalPathsStream)
+    if wrapped:
+        sys.stdout = _FinalPathsStream(stdout)
+    try:
+        yield
+    finally:
+        if wrapped and isinstance(sys.stdout, _FinalPathsStream):
+            sys.stdout = stdout
+        _staged.reset(reset)
+
+
+def _move_into_place(staging_dir, output_folder):
+    """Move every file under staging_dir to the same relative path under output_folder."""
+    for folder, _, files in os.walk(staging_dir):
+        target = output_folder / os.path.relpath(folder, staging_dir)
+        target.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            os.replace(os.path.join(folder, name), target / name)
+
+
+def _count_files(folder):
+    return sum(len(files) for _, _, files in os.walk(folder))
+
+
+def tracked(description):
+    """
+    Give a handler method a progress reporter and cooperative cancellation.
+
+    The method reports through start()/advance(). It writes into a private hidden folder
+    inside output_folder whose files are moved into output_folder when it returns or
+    fails; if it is cancelled they are deleted instead, so only this call's outputs go
+    and files from other jobs sharing the folder are never touched. Log lines and prints
+    name output_folder rather than the staging folder (see final_paths). Outside a
+    cancellation() block a token is created per call, cancelled by Ctrl+C when running
+    on the main thread. Nested tracked calls share the outer reporter.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _reporter.get() is not None:
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            output_folder = Path(bound.arguments['output_folder'])
+            output_folder.mkdir(parents=True, exist_ok=True)
+            staging_dir = tempfile.mkdtemp(dir=output_folder, prefix=STAGING_PREFIX)
+            bound.arguments['output_folder'] = staging_dir
+
+            token = _token.get() or CancelToken()
+            reporter = ProgressReporter(description)
+            reporter_reset = _reporter.set(reporter)
+            token_reset = _token.set(token)
+            status = 'failed'
+            keep = False
+            try:
+                with _cancel_on_interrupt(token), final_paths(staging_dir, output_folder):
+                    result = func(*bound.args, **bound.kwargs)
+                status = 'done'
+                keep = True
+                return result
+            except OperationCancelled:
+                status = 'cancelled'
+                logging.warning(f"{description} cancelled; removed {_count_files(staging_dir)} partial output file(s)")
+                raise
+            except Exception:
+                # A failed call keeps whatever it did write, as it would without staging
+                keep = True
+                raise
+            finally:
+                try:
+                    if keep:
+                        _move_into_place(staging_dir, output_folder)
+                finally:
+                    shutil.rmtree(staging_dir, ignore_errors=True)
+                    reporter.close(status)
+                    _token.reset(token_reset)
+                    _reporter.reset(reporter_reset)
+
+        return wrapper
+    return decorator
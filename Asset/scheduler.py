@@ -0,0 +1,194 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Asset.cli import OPERATIONS, expand_inputs, output_folders, pooled_options, run_job
+from Asset.utils import configure_logging
+
+JOB_STATES = ('queued', 'running', 'done', 'failed')
+
+
+def default_pool_sizes():
+    """Processes per handler type: PDF and image work scale with the CPUs, Excel jobs hold whole frames in memory."""
+    cpus = os.cpu_count() or 1
+    return {'pdf': cpus, 'image': cpus, 'excel': max(1, cpus // 2)}
+
+
+class Job:
+    """One handler operation on one input, with its state and timings."""
+
+    def __init__(self, job_id, group, command, input_path, options=None, priority=0):
+        if group not in OPERATIONS or command not in OPERATIONS[group]:
+            raise ValueError(f"Unknown operation: {group} {command}")
+        self.id = job_id
+        self.group = group
+        self.command = command
+        self.input_path = input_path
+        self.options = options or {}
+        self.priority = priority
+        self.state = 'queued'
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def wait_time(self):
+        return (self.started or time.time()) - self.submitted
+
+    @property
+    def run_time(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'operation': f"{self.group} {self.command}",
+            'input': self.input_path,
+            'priority': self.priority,
+            'state': self.state,
+            'error': self.error,
+            'wait_seconds': round(self.wait_time, 3),
+            'run_seconds': round(self.run_time, 3),
+        }
+
+
+class JobScheduler:
+    """
+    Run many handler jobs concurrently with a priority queue and process pool per handler type.
+
+    Lower priority values run first; equal priorities run in submission order. Each
+    handler type gets its own pool, so a long Excel merge only occupies Excel slots and
+    never delays queued image or PDF jobs. Handlers that parallelise internally run with
+    workers=1 unless the job sets workers, as the pool already fills the CPUs. Jobs
+    submitted while run() is in progress (e.g. from another task) join the live queues.
+    """
+
+    def __init__(self, pool_sizes=None):
+        self.pool_sizes = default_pool_sizes()
+        self.pool_sizes.update(pool_sizes or {})
+        self.jobs = []
+        self._pending = {group: [] for group in OPERATIONS}
+        self._ids = itertools.count(1)
+        self._running = False
+        self._queues = {}
+        self._pools = {}
+        self._live = {}
+        self._workers = []
+
+    def submit(self, group, command, input_path, priority=0, **options):
+        """Queue one job; returns the Job so callers can follow its state."""
+        job = Job(next(self._ids), group, command, input_path, options, priority)
+        self.jobs.append(job)
+        if self._running:
+            self._enqueue(job)
+        else:
+            self._pending[group].append(job)
+        return job
+
+    def submit_spec(self, spec):
+        """
+        Queue the jobs described by one jobs-file entry.
+
+        An entry is {"group", "command", "input", "priority"?, "options"?}; "input" may be
+        a glob pattern, which queues one job per matching file or folder; those jobs get
+        separate output folders when their outputs would collide (see cli.output_folders).
+        """
+        group, command = spec['group'], spec['command']
+        if group not in OPERATIONS or command not in OPERATIONS[group]:
+            raise ValueError(f"Unknown operation: {group} {command}")
+        _, kind, extensions, _ = OPERATIONS[group][command]
+        inputs = expand_inputs([spec['input']], kind, extensions)
+        if not inputs:
+            logging.warning(f"No matching input {kind}s for {spec['input']}")
+        options = spec.get('options', {})
+        folders = output_folders(group, command, inputs, options.get('output_folder'))
+        return [self.submit(group, command, path, spec.get('priority', 0),
+                            **(dict(options, output_folder=folder) if folder else options))
+                for path, folder in zip(inputs, folders)]
+
+    async def run(self):
+        """Run every queued job, and any submitted meanwhile, to completion and return the list of jobs."""
+        self._running = True
+        try:
+            for pending in self._pending.values():
+                for job in pending:
+                    self._enqueue(job)
+                pending.clear()
+
+            # Jobs submitted while these run may start more workers, so wait until none are left
+            while self._workers:
+                workers, self._workers = self._workers, []
+                await asyncio.gather(*workers)
+        finally:
+            self._running = False
+            for pool in self._pools.values():
+                pool.shutdown()
+            self._queues, self._pools = {}, {}
+        return self.jobs
+
+    def _enqueue(self, job):
+        """Queue a job for the running scheduler, starting its group's pool and a worker as needed."""
+        group = job.group
+        if group not in self._queues:
+            self._queues[group] = asyncio.PriorityQueue()
+            self._pools[group] = ProcessPoolExecutor(max_workers=self.pool_sizes[group],
+                                                     initializer=configure_logging, initargs=('Output',))
+            self._live[group] = 0
+        # Job ids grow with submission order, so equal priorities run first come first served
+        self._queues[group].put_nowait((job.priority, job.id, job))
+        if self._live[group] < self.pool_sizes[group]:
+            self._live[group] += 1
+            self._workers.append(asyncio.create_task(self._worker(group)))
+
+    async def _worker(self, group):
+        loop = asyncio.get_running_loop()
+        queue = self._queues[group]
+        try:
+            while not queue.empty():
+                _, _, job = queue.get_nowait()
+                job.state = 'running'
+                job.started = time.time()
+                logging.info(f"Job {job.id} started: {job.group} {job.command} {job.input_path} "
+                             f"(waited {job.wait_time:.2f}s)")
+
+                try:
+                    _, job.error, _ = await loop.run_in_executor(
+                        self._pools[group], run_job, job.group, job.command, job.input_path,
+                        pooled_options(job.group, job.command, job.options))
+                except Exception as e:  # the worker process itself died
+                    job.error = str(e)
+
+                job.finished = time.time()
+                job.state = 'failed' if job.error else 'done'
+                if job.error:
+                    logging.error(f"Job {job.id} failed after {job.run_time:.2f}s: {job.error}")
+                else:
+                    logging.info(f"Job {job.id} done in {job.run_time:.2f}s")
+        finally:
+            self._live[group] -= 1
+
+    def summary(self):
+        """Job counts per state."""
+        counts = dict.fromkeys(JOB_STATES, 0)
+        for job in self.jobs:
+            counts[job.state] += 1
+        return counts
+
+
+def load_jobs(jobs_path, scheduler):
+    """Queue every entry of a JSON jobs file (a list of job specs) on the scheduler."""
+    with open(jobs_path) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError(f"{jobs_path} must contain a JSON list of jobs")
+    jobs = []
+    for spec in specs:
+        jobs += scheduler.submit_spec(spec)
+    return jobs
@@ -0,0 +1,309 @@
+import ipaddress
+import json
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from Asset.cli import OPERATIONS, build_parser, handler_class, handler_options, pooled_options, run_job
+from Asset.metrics import load_totals, render_prometheus
+from Asset.progress import set_progress_mode
+from Asset.scheduler import default_pool_sizes
+from Asset.utils import configure_logging
+
+COPY_BUFFER = 1024 * 1024
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+MAX_ARCHIVE_MEMBERS = 10000
+
+
+def _ping():
+    return os.getpid()
+
+
+def _init_worker(group):
+    configure_logging('Output')
+    # Handlers are imported lazily; load this pool's one up front so workers are really warm
+    handler_class(group)
+
+
+class TaskMasterServer(ThreadingHTTPServer):
+    """
+    Long-lived HTTP front end for the handlers, bound to localhost by default.
+
+    POST /<group>/<command> with the input as the request body (a file, or a zip of the
+    input folder for folder operations) and the CLI options as query parameters, e.g.
+    POST /pdf/split?pages-per-file=10 with header X-Filename: report.pdf. The response is
+    the single output file, or a zip when the operation produced several. Jobs run on warm
+    per-handler process pools, each job single-process unless it passes workers;
+    requests beyond max_pending are refused with 503. Uploads over max_upload_mb, and zips
+    that would unpack to more than max_unzip_mb or MAX_ARCHIVE_MEMBERS files, are refused
+    with 413. GET /health reports pool sizes
+    and load, GET /metrics the operation totals in Prometheus format (empty unless
+    metrics were turned on with --metrics).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=8765, pool_sizes=None, max_pending=None, max_upload_mb=1024,
+                 max_unzip_mb=4096):
+        self.pool_sizes = default_pool_sizes()
+        self.pool_sizes.update(pool_sizes or {})
+        self.max_pending = max_pending or 2 * sum(self.pool_sizes.values())
+        self.max_upload = max_upload_mb * 1024 * 1024
+        self.max_unzip = max_unzip_mb * 1024 * 1024
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self.parser = build_parser()
+        set_progress_mode('off')
+        # Start the pools before serving so workers are forked without handler threads around
+        self.pools = {group: self._start_pool(group) for group in OPERATIONS}
+        super().__init__((host, port), _RequestHandler)
+        if not ipaddress.ip_address(self.server_address[0]).is_loopback:
+            logging.warning(f"TaskMaster server is reachable on {host}, not only from this machine")
+
+    def _start_pool(self, group):
+        size = self.pool_sizes[group]
+        pool = ProcessPoolExecutor(max_workers=size, initializer=_init_worker, initargs=(group,))
+        # Spawn every worker now so the first requests don't pay for process start-up
+        for future in [pool.submit(_ping) for _ in range(size)]:
+            future.result()
+        return pool
+
+    def run_job(self, group, command, input_path, options):
+        """Run one operation on the group's pool, replacing the pool if a worker died."""
+        pool = self.pools[group]
+        try:
+            return pool.submit(run_job, group, command, input_path,
+                               pooled_options(group, command, options)).result()
+        except BrokenProcessPool:
+            with self._pool_lock:
+                # Every request on the broken pool ends up here; only the first replaces it
+                if self.pools[group] is pool:
+                    logging.error(f"{group} worker pool broke; restarting it")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.pools[group] = self._start_pool(group)
+            return input_path, "worker process died", 0.0
+
+    def server_close(self):
+        super().server_close()
+        for pool in self.pools.values():
+            pool.shutdown(cancel_futures=True)
+
+    def stats(self):
+        return {
+            'status': 'ok',
+            'pools': self.pool_sizes,
+            'in_flight': self.in_flight,
+            'max_pending': self.max_pending,
+            'completed': self.completed,
+            'failed': self.failed,
+        }
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = 'TaskMaster'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logging.info(f"HTTP {self.address_string()} {format % args}")
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip('/')
+        if path == '/health':
+            self._send_json(200, self.server.stats())
+        elif path == '/metrics':
+            body = render_prometheus(load_totals()).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path == '':
+            self._send_json(200, {group: sorted(commands) for group, commands in OPERATIONS.items()})
+        else:
+            self._send_json(404, {'error': f"Unknown path: {path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] not in OPERATIONS or parts[1] not in OPERATIONS[parts[0]]:
+            return self._refuse(404, f"Unknown operation: {url.path}")
+        group, command = parts
+
+        length = self.headers.get('Content-Length')
+        if length is None:
+            return self._refuse(411, "Content-Length is required")
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self._refuse(400, "Content-Length must be a non-negative integer")
+        if length > self.server.max_upload:
+            return self._refuse(413, f"Upload exceeds {self.server.max_upload // (1024 * 1024)} MB")
+
+        # Backpressure: refuse instead of queueing without bound
+        if not self.server.slots.acquire(blocking=False):
+            return self._refuse(503, "Server busy, retry later", {'Retry-After': '1'})
+
+        work_dir = Path(tempfile.mkdtemp(prefix='taskmaster_'))
+        try:
+            with self.server._lock:
+                self.server.in_flight += 1
+            self._handle_job(group, command, parse_qs(url.query), length, work_dir)
+        finally:
+            with self.server._lock:
+                self.server.in_flight -= 1
+            self.server.slots.release()
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _handle_job(self, group, command, query, length, work_dir):
+        _, kind, extensions, option_specs = OPERATIONS[group][command]
+        upload_name = os.path.basename(self.headers.get('X-Filename') or query.pop('filename', [''])[0])
+        if kind == 'file':
+            upload_name = upload_name or f"upload{extensions[0] if extensions else ''}"
+            if extensions and not upload_name.lower().endswith(extensions):
+                return self._drain_and_refuse(length, 400, f"{command} expects one of {', '.join(extensions)}")
+
+        try:
+            argv = [group, command, 'INPUT', '--output-dir', str(work_dir / 'output')]
+            argv += _query_to_argv(query, option_specs)
+            options = handler_options(self.server.parser.parse_args(argv))
+        except (SystemExit, ValueError) as e:
+            message = str(e) if isinstance(e, ValueError) else "Invalid options"
+            return self._drain_and_refuse(length, 400, message)
+
+        upload_path = work_dir / (upload_name or 'upload.zip')
+        with open(upload_path, 'wb') as f:
+            _copy_stream(self.rfile, f, length)
+
+        if kind == 'folder':
+            input_path = work_dir / 'input'
+            try:
+                with zipfile.ZipFile(upload_path) as archive:
+                    # Sizes come from the central directory; extraction stops at each member's
+                    # declared size, so a member can't unpack to more than is checked here
+                    members = archive.infolist()
+                    if len(members) > MAX_ARCHIVE_MEMBERS:
+                        return self._send_json(413, {'error': f"Zip holds more than {MAX_ARCHIVE_MEMBERS} files"})
+                    if sum(member.file_size for member in members) > self.server.max_unzip:
+                        limit = self.server.max_unzip // (1024 * 1024)
+                        return self._send_json(413, {'error': f"Zip unpacks to more than {limit} MB"})
+                    archive.extractall(input_path)
+            except zipfile.BadZipFile:
+                return self._send_json(400, {'error': f"{command} expects a zip of the input folder"})
+            upload_path.unlink()
+        else:
+            input_path = upload_path
+
+        _, error, elapsed = self.server.run_job(group, command, str(input_path), options)
+        with self.server._lock:
+            if error:
+                self.server.failed += 1
+            else:
+                self.server.completed += 1
+        if error:
+            return self._send_json(500, {'error': error})
+
+        outputs = sorted(path for path in (work_dir / 'output').rglob('*') if path.is_file())
+        if not outputs:
+            return self._send_json(200, {'status': 'ok', 'files': [], 'seconds': round(elapsed, 3)})
+        if len(outputs) == 1:
+            return self._send_file(outputs[0], outputs[0].name, elapsed)
+
+        bundle = work_dir / f"{group}_{command}.zip"
+        # Outputs are mostly already-compressed PDFs and images, so store them as-is
+        with zipfile.ZipFile(bundle, 'w', zipfile.ZIP_STORED) as archive:
+            for path in outputs:
+                archive.write(path, path.relative_to(work_dir / 'output').as_posix())
+        self._send_file(bundle, bundle.name, elapsed)
+
+    def _send_file(self, path, name, elapsed):
+        self.send_response(200)
+        self.send_header('Content-Type', mimetypes.guess_type(name)[0] or 'application/octet-stream')
+        self.send_header('Content-Length', str(path.stat().st_size))
+        self.send_header('Content-Disposition', f'attachment; filename="{name}"')
+        self.send_header('X-TaskMaster-Seconds', f"{elapsed:.3f}")
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, COPY_BUFFER)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _refuse(self, status, message, headers=None):
+        # The request body was not read, so the connection cannot be reused
+        self.close_connection = True
+        self._send_json(status, {'error': message}, dict(headers or {}, Connection='close'))
+
+    def _drain_and_refuse(self, length, status, message):
+        _copy_stream(self.rfile, None, length)
+        self._send_json(status, {'error': message})
+
+
+def _copy_stream(source, target, length):
+    """Copy exactly length bytes in bounded chunks; target None discards them."""
+    remaining = length
+    while remaining > 0:
+        data = source.read(min(remaining, COPY_BUFFER))
+        if not data:
+            raise ConnectionError("Client closed the connection mid-upload")
+        if target is not None:
+            target.write(data)
+        remaining -= len(data)
+
+
+def _query_to_argv(query, option_specs):
+    """Turn ?pages-per-file=2&size=64x64&size=128x128&lossless=1 into CLI flags."""
+    specs = {flags[0].lstrip('-'): (flags[0], kwargs) for flags, kwargs in option_specs}
+    argv = []
+    for name, values in query.items():
+        if name not in specs:
+            raise ValueError(f"Unknown option: {name}")
+        flag, kwargs = specs[name]
+        if kwargs.get('action') in ('store_true', 'store_const'):
+            if values[-1].lower() in TRUE_VALUES:
+                argv.append(flag)
+        elif kwargs.get('action') == 'append':
+            for value in values:
+                argv += [flag, value]
+        else:
+            argv += [flag, values[-1]]
+    return argv
+
+
+def serve(host='127.0.0.1', port=8765, pool_sizes=None, max_pending=None):
+    """Run the server until interrupted."""
+    server = TaskMasterServer(host, port, pool_sizes, max_pending)
+    logging.info(f"TaskMaster server listening on http://{host}:{server.server_address[1]} "
+                 f"(pools {server.pool_sizes}, max pending {server.max_pending})")
+    print(f"Serving on http://{host}:{server.server_address[1]} (Ctrl+C to stop)")
+    started = time.perf_counter()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logging.info(f"TaskMaster server stopped after {time.perf_counter() - started:.0f}s, "
+                     f"{server.completed} job(s) completed, {server.failed} failed")
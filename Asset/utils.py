@@ -1,9 +1,88 @@
 import os
+import sys
+import logging
+import signal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from Asset.discovery import discover
 
 def clear_screen():
     """Clear the console screen based on the OS."""
     os.system('cls' if os.name == 'nt' else 'clear')
 
+def configure_logging(output_dir='Output'):
+    """Send log records to <output_dir>/log.log, creating the folder if needed."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        filename=output_dir / 'log.log',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it can't be measured."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _init_worker():
+    # Ctrl+C is handled by the parent, which cancels the job and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_logging()
+
+def parallel_map(func, items, workers=None, chunksize=1):
+    """
+    Apply func to every item, in a process pool when more than one worker is requested.
+
+    Results are yielded in input order. func must be a module-level function so it can
+    be pickled; workers=None uses every CPU and workers=1 runs serially in-process.
+    """
+    items = list(items)
+    workers = min(workers or os.cpu_count() or 1, len(items) or 1)
+    if workers <= 1:
+        yield from map(func, items)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    try:
+        yield from executor.map(func, items, chunksize=max(1, chunksize))
+    finally:
+        # Drop queued work when the consumer stops early, e.g. on an error or a cancelled job
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def bounded_map(func, items, workers=None, max_pending=None):
+    """
+    Like parallel_map, but keeps at most max_pending tasks (default: two per worker)
+    submitted ahead of the consumer, so large results don't pile up in memory. items
+    may be a generator; it is only read as far as the submitted tasks.
+    """
+    workers = workers or os.cpu_count() or 1
+    if hasattr(items, '__len__'):
+        workers = min(workers, len(items) or 1)
+    if workers <= 1:
+        yield from map(func, items)
+        return
+
+    max_pending = max_pending or workers * 2
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    try:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
 def display_logo():
     """Display the logo on the screen."""
     logo = """
@@ -23,7 +102,8 @@ def list_files_and_select(extension=None, is_folder=False):
     List files and folders in the current directory and allow the user to select one.
     
     Parameters:
-    - extension: File extension to filter (e.g., '.pdf' or '.jpg'). If None, all files are listed.
+    - extension: File extension(s) to filter (e.g., '.pdf' or ('.jpg', '.png')), matched ignoring case.
+      If None, all files are listed.
     - is_folder: If True, only folders are listed.
     
     Returns:
@@ -31,11 +111,9 @@ def list_files_and_select(extension=None, is_folder=False):
     """
     parent_dir = os.getcwd()
 
-    if is_folder:
-        items = [f for f in os.listdir(parent_dir) if os.path.isdir(f)]
-    else:
-        # Correct logic for filtering files by extension
-        items = [f for f in os.listdir(parent_dir) if extension is None or f.endswith(extension)]
+    # Like a plain directory listing: hidden entries and symlinked folders are offered too
+    items = [entry.name for entry in discover(parent_dir, extension, folders=is_folder, hidden=True,
+                                              follow_symlinks=True)]
 
     if not items:
         print("\033[92mNo valid files or folders found.\033[0m")
@@ -0,0 +1,328 @@
+import ctypes
+import ctypes.util
+import hashlib
+import io
+import json
+import logging
+import os
+import select
+import sys
+import time
+from pathlib import Path
+
+from Asset import progress
+from Asset.discovery import discover, natural_key
+from Asset.utils import parallel_map
+
+# inotify(7) event bits
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+MANIFEST_VERSION = 2
+# Each watch writes into its own folder here unless given an output folder
+WATCH_OUTPUT_ROOT = 'Output/Watch'
+
+
+class Manifest:
+    """
+    Size, mtime and SHA-256 of every input seen at the last successful run.
+
+    Stored as JSON under Output/.watch/, one file per (folder, operation) pair, together
+    with the size and mtime of the merged output as that run left it.
+    """
+
+    def __init__(self, folder, operation, root='Output/.watch'):
+        self.folder_id = hashlib.sha1(f"{os.path.abspath(folder)}|{operation}".encode()).hexdigest()[:16]
+        self.path = Path(root) / f"{operation}_{self.folder_id}.json"
+        self.files = {}
+        self.output = None
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.files, self.output = data['files'], data['output']
+        else:
+            # Older manifests are the bare file map and say nothing about the output
+            self.files = data
+
+    def scan(self, folder, extensions):
+        """Current {name: [size, mtime_ns, sha256]}, rehashing only files whose stat changed."""
+        current = {}
+        # Same selection as the handlers' default (non-recursive) discovery
+        for entry in discover(folder, extensions, sort=False):
+            stat = entry.stat()
+            known = self.files.get(entry.name)
+            if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                current[entry.name] = known
+            else:
+                current[entry.name] = [stat.st_size, stat.st_mtime_ns, _sha256(entry.path)]
+        return current
+
+    def diff(self, current):
+        """(added, changed, removed) file names, each in natural order like the handlers."""
+        added = sorted((name for name in current if name not in self.files), key=natural_key)
+        changed = sorted((name for name in current
+                          if name in self.files and current[name][2] != self.files[name][2]), key=natural_key)
+        removed = sorted((name for name in self.files if name not in current), key=natural_key)
+        return added, changed, removed
+
+    def save(self, current, output=None):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix('.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': current, 'output': output}, f)
+        os.replace(temp_path, self.path)
+        self.files = current
+        self.output = output
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _identity(path):
+    """[size, mtime_ns] of path, or None when there is no such file."""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class _Inotify:
+    """Minimal ctypes binding to Linux inotify for one directory."""
+
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout, settle=0.5):
+        """Block until events arrive (True) or timeout passes (False), then drain the burst."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        while ready:
+            try:
+                os.read(self.fd, 65536)
+            except BlockingIOError:
+                pass
+            ready, _, _ = select.select([self.fd], [], [], settle)
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """
+    Keep a folder operation's output up to date by processing only new or changed inputs.
+
+    Supported operations are the keys of INCREMENTAL_OPERATIONS. Merged PDFs and
+    workbooks are appended to when every new file sorts after the inputs already
+    merged and the output is still the file the last sync wrote; any change, removal,
+    out-of-order addition or outside edit of the output triggers one full rebuild
+    instead. The single-worksheet merge always rebuilds (streamed), since appending
+    to an xlsx means loading and saving the whole workbook. Outputs go to
+    Output/Watch/<operation>_<folder>_<id>/ unless output_folder is given. Inputs
+    that fail are left out of the manifest and retried on the next sync. Changes are
+    picked up through inotify on Linux and by polling every `interval` seconds
+    elsewhere.
+    """
+
+    def __init__(self, folder, operation, output_folder=None, interval=5.0, use_inotify=True, **options):
+        if operation not in INCREMENTAL_OPERATIONS:
+            raise ValueError(f"Unsupported watch operation: {operation}")
+        self.folder = folder
+        self.operation = operation
+        self.extensions, output_name, self.process = INCREMENTAL_OPERATIONS[operation]
+        self.manifest = Manifest(folder, operation)
+        if output_folder is None:
+            folder_name = Path(os.path.abspath(folder)).name
+            output_folder = Path(WATCH_OUTPUT_ROOT) / f"{operation}_{folder_name}_{self.manifest.folder_id[:8]}"
+        self.output_folder = Path(output_folder)
+        self.output_path = self.output_folder / output_name if output_name else None
+        self.interval = interval
+        self.options = options
+        self._inotify = None
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._inotify = _Inotify(folder)
+            except OSError as e:
+                logging.warning(f"inotify unavailable, polling {folder} instead: {e}")
+
+    def sync(self):
+        """Process the current delta once; returns (added, changed, removed)."""
+        current = self.manifest.scan(self.folder, self.extensions)
+        added, changed, removed = self.manifest.diff(current)
+        output = self.manifest.output
+        if added or changed or removed:
+            self.output_folder.mkdir(parents=True, exist_ok=True)
+            failed = self.process(self, added, changed, removed)
+            logging.info(f"Watch {self.operation} on {self.folder}: {len(added)} added, "
+                         f"{len(changed)} changed, {len(removed)} removed, {len(failed)} failed")
+            # Inputs missing from the manifest count as added, so failed ones are retried next sync
+            for name in failed:
+                current.pop(name, None)
+            output = _identity(self.output_path)
+        self.manifest.save(current, output)
+        return added, changed, removed
+
+    def run(self, max_cycles=None):
+        """Sync, then wait for changes and sync again until interrupted or max_cycles syncs ran."""
+        cycles = 0
+        try:
+            while True:
+                try:
+                    self.sync()
+                except Exception as e:
+                    # The manifest is left as it was, so the same delta is retried next time
+                    logging.error(f"Watch {self.operation} on {self.folder} failed: {e}")
+                cycles += 1
+                if max_cycles is not None and cycles >= max_cycles:
+                    return
+                if self._inotify:
+                    self._inotify.wait(timeout=None)
+                else:
+                    time.sleep(self.interval)
+        finally:
+            if self._inotify:
+                self._inotify.close()
+
+    def can_append(self, added, changed, removed):
+        """True when the merged output is the one the last sync wrote and the new files simply extend its order."""
+        if changed or removed or not self.manifest.files:
+            return False
+        if self.manifest.output is None or self.manifest.output != _identity(self.output_path):
+            return False
+        last = max(self.manifest.files, key=natural_key)
+        return all(natural_key(name) > natural_key(last) for name in added)
+
+    def path(self, name):
+        return Path(self.folder) / name
+
+
+# Processors import their handler on first use so the CLI starts without pandas, pikepdf and PIL.
+# Each returns the names of the inputs it could not process.
+
+def _pdf_merge(watcher, added, changed, removed):
+    import pikepdf
+    from Asset.pdf_handler import PDFHandler
+
+    output_path = watcher.output_path
+    if not watcher.can_append(added, changed, removed):
+        # merge leaves unreadable PDFs out; they are retried like failed appends
+        with progress.failures() as skipped:
+            PDFHandler.merge(watcher.folder, watcher.output_folder)
+        return [os.path.relpath(path, watcher.folder) for path in skipped]
+
+    sources = []
+    failed = []
+    with pikepdf.Pdf.open(output_path, allow_overwriting_input=True) as merged_pdf:
+        try:
+            for name in added:
+                try:
+                    pdf = pikepdf.Pdf.open(watcher.path(name))
+                except Exception as e:
+                    logging.warning(f"Skipping {name} due to error: {e}")
+                    failed.append(name)
+                    continue
+                sources.append(pdf)
+                merged_pdf.pages.extend(pdf.pages)
+            merged_pdf.save(output_path)
+        finally:
+            for pdf in sources:
+                pdf.close()
+    logging.info(f"Appended {len(sources)} PDF(s) to {output_path}")
+    return failed
+
+
+def _images_to_pdf(watcher, added, changed, removed):
+    import img2pdf
+    import pikepdf
+    from Asset.pdf_handler import PDFHandler
+
+    output_path = watcher.output_path
+    if not watcher.can_append(added, changed, removed):
+        PDFHandler.images_to_pdf(watcher.folder, watcher.output_folder)
+        return []
+
+    new_pages = img2pdf.convert([str(watcher.path(name)) for name in added])
+    with pikepdf.Pdf.open(output_path, allow_overwriting_input=True) as combined, \
+            pikepdf.Pdf.open(io.BytesIO(new_pages)) as addition:
+        combined.pages.extend(addition.pages)
+        combined.save(output_path)
+    logging.info(f"Appended {len(added)} image(s) to {output_path}")
+    return []
+
+
+def _batch_convert(watcher, added, changed, removed):
+    from Asset.image_handler import _convert_image_file
+
+    output_format = watcher.options.get('output_format', 'png')
+    for name in removed:
+        (watcher.output_folder / f"{Path(name).stem}.{output_format}").unlink(missing_ok=True)
+
+    names = added + changed
+    tasks = [(str(watcher.path(name)), str(watcher.output_folder), output_format) for name in names]
+    failed = []
+    for name, (filename, new_filename, error) in zip(names, parallel_map(_convert_image_file, tasks)):
+        if error is None:
+            logging.info(f"Converted: {watcher.path(filename)} → {watcher.output_folder / new_filename}")
+        else:
+            logging.error(f"Error converting {watcher.path(filename)}: {error}")
+            failed.append(name)
+    return failed
+
+
+def _merge_worksheet(watcher, added, changed, removed):
+    from Asset.excel_tool import ExcelTool
+
+    # No append path: adding rows to an xlsx means loading and saving the whole workbook
+    # with openpyxl, which costs more than this constant-memory rebuild
+    ExcelTool.merge_worksheet(watcher.folder, watcher.output_folder, streaming=True)
+    return []
+
+
+def _merge_workbook(watcher, added, changed, removed):
+    import pandas as pd
+    from Asset.excel_tool import ExcelTool, _load_frame, unique_sheet_name
+
+    output_path = watcher.output_path
+    if not watcher.can_append(added, changed, removed):
+        ExcelTool.merge_workbook(watcher.folder, watcher.output_folder)
+        return []
+
+    with pd.ExcelWriter(output_path, engine='openpyxl', mode='a') as writer:
+        # Named as a rebuild would name them, so no new sheet replaces an existing one
+        used_names = {name.casefold() for name in writer.book.sheetnames}
+        for name in added:
+            _, df, _ = _load_frame((str(watcher.path(name)), name))
+            sheet_name = unique_sheet_name(name, used_names)
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+            logging.info(f"Added {name} as sheet {sheet_name}")
+    return []
+
+
+# operation -> (input extensions, merged output file name or None, processor)
+# Extensions and file names mirror the handler each operation rebuilds with.
+INCREMENTAL_OPERATIONS = {
+    'pdf-merge': (('.pdf',), 'merged.pdf', _pdf_merge),
+    'images-to-pdf': (('.jpg', '.jpeg', '.png'), 'images_combined.pdf', _images_to_pdf),
+    'image-batch-convert': (('.png', '.jpg', '.jpeg'), None, _batch_convert),
+    'excel-merge-worksheet': (('.xlsx', '.csv'), 'merged_worksheet.xlsx', _merge_worksheet),
+    'excel-merge-workbook': (('.xlsx', '.csv'), 'merged_workbook.xlsx', _merge_workbook),
+}
@@ -0,0 +1,79 @@
+"""
+Compare the calamine and openpyxl workbook readers used by ExcelTool.
+
+Generates a wide and a tall synthetic workbook and times pd.read_excel with each engine:
+
+    python benchmarks/bench_excel_readers.py --repeat 3
+"""
+import argparse
+import importlib.util
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import xlsxwriter
+
+SHAPES = {
+    'wide': (2000, 250),    # rows, columns
+    'tall': (200000, 8),
+}
+
+
+def write_workbook(path, rows, columns, seed=0):
+    """Deterministic mix of numbers, text and dates, written with xlsxwriter."""
+    rng = random.Random(seed)
+    workbook = xlsxwriter.Workbook(str(path), {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Sheet1')
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+    worksheet.write_row(0, 0, [f"col_{idx}" for idx in range(columns)])
+    for row in range(1, rows + 1):
+        for col in range(columns):
+            kind = col % 3
+            if kind == 0:
+                worksheet.write_number(row, col, rng.random() * 1000)
+            elif kind == 1:
+                worksheet.write_string(row, col, f"item-{rng.randrange(10000)}")
+            else:
+                worksheet.write_number(row, col, 45000 + rng.randrange(1000), date_format)
+    workbook.close()
+
+
+def time_read(path, engine, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pd.read_excel(path, engine=engine)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='Timed reads per engine and shape (default: 3)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply the row counts (default: 1.0)')
+    args = parser.parse_args()
+
+    engines = ['openpyxl']
+    if importlib.util.find_spec('python_calamine'):
+        engines.insert(0, 'calamine')
+    else:
+        print("python-calamine is not installed; only openpyxl will be timed.")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        print(f"{'shape':<6} {'rows':>8} {'cols':>5} " + ' '.join(f"{engine:>10}" for engine in engines) + '   speedup')
+        for shape, (rows, columns) in SHAPES.items():
+            rows = max(1, int(rows * args.scale))
+            path = Path(temp_dir) / f"{shape}.xlsx"
+            write_workbook(path, rows, columns)
+            results = {engine: time_read(path, engine, args.repeat) for engine in engines}
+            speedup = results['openpyxl'] / results['calamine'] if 'calamine' in results else 1.0
+            print(f"{shape:<6} {rows:>8} {columns:>5} "
+                  + ' '.join(f"{results[engine]:>9.2f}s" for engine in engines)
+                  + f"   {speedup:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
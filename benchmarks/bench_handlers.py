@@ -0,0 +1,344 @@
+"""
+Benchmark every public PDFHandler, ImageHandler and ExcelTool operation on synthetic inputs.
+
+The corpus (multi-page PDFs, JPEG/PNG images of several megapixel sizes, tall and wide
+CSV/XLSX files) is generated deterministically, so results are comparable between runs and
+machines of the same kind. Each case runs in a fresh child process, which records wall time
+and peak RSS; throughput and output size are derived from the run:
+
+    python benchmarks/bench_handlers.py --output benchmarks/baseline.json
+    python benchmarks/bench_handlers.py --compare benchmarks/baseline.json --threshold 0.25
+
+With --compare the exit status is 1 when any case is slower (or uses more memory) than the
+baseline by more than the threshold.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+import numpy as np
+from fpdf import FPDF
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from bench_excel_readers import write_workbook  # noqa: E402
+
+CORPUS_VERSION = 1
+IMAGE_MEGAPIXELS = (1, 4, 12)
+PDF_PAGES = 60
+PDF_SET_FILES = 12
+IMAGE_SET_FILES = 16
+EXCEL_SHAPES = {
+    'tall': (100000, 8),   # rows, columns
+    'wide': (2000, 200),
+}
+EXCEL_SET_FILES = 6
+EXCEL_SET_ROWS = 20000
+CORPUS_FOLDERS = ('pdf', 'pdf_set', 'images', 'image_set', 'excel', 'excel_set')
+
+# name -> (handler, method, input path relative to the corpus, keyword arguments, items, unit)
+CASES = {
+    'pdf.split': ('pdf', 'split', 'pdf/document.pdf', {'pages_per_file': 5}, PDF_PAGES, 'pages'),
+    'pdf.merge': ('pdf', 'merge', 'pdf_set', {}, PDF_SET_FILES * 10, 'pages'),
+    'pdf.remove_blank': ('pdf', 'remove_blank', 'pdf/document.pdf', {}, PDF_PAGES, 'pages'),
+    'pdf.compress_pdf': ('pdf', 'compress_pdf', 'pdf/document.pdf', {}, PDF_PAGES, 'pages'),
+    'pdf.images_to_pdf': ('pdf', 'images_to_pdf', 'image_set', {}, IMAGE_SET_FILES, 'images'),
+    'image.extract_data': ('image', 'extract_data', 'images/jpeg_12mp.jpg', {}, 1, 'images'),
+    'image.extract_data_batch': ('image', 'extract_data_batch', 'image_set', {}, IMAGE_SET_FILES, 'images'),
+    'image.remove_exif_data': ('image', 'remove_exif_data', 'images/jpeg_12mp.jpg', {}, 1, 'images'),
+    'image.remove_exif_folder': ('image', 'remove_exif_folder', 'image_set', {}, IMAGE_SET_FILES, 'images'),
+    'image.compress_image.1mp': ('image', 'compress_image', 'images/jpeg_1mp.jpg', {}, 1, 'images'),
+    'image.compress_image.12mp': ('image', 'compress_image', 'images/jpeg_12mp.jpg', {}, 1, 'images'),
+    'image.convert_format.png_4mp': ('image', 'convert_format', 'images/png_4mp.png', {'target_format': 'JPEG'}, 1,
+                                     'images'),
+    'image.convert_format.jpeg_12mp': ('image', 'convert_format', 'images/jpeg_12mp.jpg', {'target_format': 'PNG'}, 1,
+                                       'images'),
+    'image.resize_image': ('image', 'resize_image', 'images/jpeg_12mp.jpg', {'width': 1024}, 1, 'images'),
+    'image.make_thumbnails': ('image', 'make_thumbnails', 'images/jpeg_12mp.jpg', {}, 1, 'images'),
+    'image.batch_thumbnails': ('image', 'batch_thumbnails', 'image_set', {}, IMAGE_SET_FILES, 'images'),
+    'image.batch_convert_format': ('image', 'batch_convert_format', 'image_set', {'output_format': 'png'},
+                                   IMAGE_SET_FILES, 'images'),
+    'image.images_to_pdf_with_filenames': ('image', 'images_to_pdf_with_filenames', 'image_set',
+                                           {'output_pdf': 'catalog.pdf'}, IMAGE_SET_FILES, 'images'),
+    'excel.merge_workbook': ('excel', 'merge_workbook', 'excel_set', {}, EXCEL_SET_FILES * EXCEL_SET_ROWS, 'rows'),
+    'excel.merge_worksheet': ('excel', 'merge_worksheet', 'excel_set', {}, EXCEL_SET_FILES * EXCEL_SET_ROWS, 'rows'),
+    'excel.merge_worksheet.streaming': ('excel', 'merge_worksheet', 'excel_set', {'streaming': True},
+                                        EXCEL_SET_FILES * EXCEL_SET_ROWS, 'rows'),
+    'excel.excel_to_csv.tall': ('excel', 'excel_to_csv', 'excel/tall.xlsx', {}, EXCEL_SHAPES['tall'][0], 'rows'),
+    'excel.excel_to_csv.wide': ('excel', 'excel_to_csv', 'excel/wide.xlsx', {}, EXCEL_SHAPES['wide'][0], 'rows'),
+    'excel.csv_to_excel.tall': ('excel', 'csv_to_excel', 'excel/tall.csv', {}, EXCEL_SHAPES['tall'][0], 'rows'),
+    'excel.csv_to_excel.large_file': ('excel', 'csv_to_excel', 'excel/tall.csv', {'large_file': True},
+                                      EXCEL_SHAPES['tall'][0], 'rows'),
+    'excel.format_excel.tall': ('excel', 'format_excel', 'excel/tall.xlsx', {}, EXCEL_SHAPES['tall'][0], 'rows'),
+    'excel.format_excel.streaming': ('excel', 'format_excel', 'excel/tall.xlsx', {'streaming': True},
+                                     EXCEL_SHAPES['tall'][0], 'rows'),
+}
+
+
+def synthetic_image(width, height, seed):
+    """Smooth gradients plus seeded noise, so codecs see photo-like rather than flat content."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([x / width * 255, y / height * 255, (x + y) / (width + height) * 255], axis=-1)
+    noise = rng.normal(0, 12, size=(height, width, 3)).astype(np.float32)
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+
+def save_jpeg(image, path, index):
+    exif = Image.Exif()
+    exif[0x010F] = 'TaskMaster'                    # Make
+    exif[0x0110] = f'Bench {index}'                # Model
+    exif[0x0132] = '2024:01:01 12:00:00'           # DateTime
+    image.save(path, 'JPEG', quality=90, exif=exif.tobytes())
+
+
+def megapixel_size(megapixels):
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    return width, width * 3 // 4
+
+
+def write_pdf(path, pages, image_paths, seed):
+    """Text pages with an embedded photo on every third page and a blank page every fifth."""
+    rng = random.Random(seed)
+    pdf = FPDF()
+    pdf.set_creation_date(datetime(2024, 1, 1, tzinfo=timezone.utc))
+    pdf.set_font('helvetica', size=10)
+    words = ['invoice', 'total', 'quarter', 'report', 'summary', 'balance', 'region', 'figure']
+    for page in range(pages):
+        pdf.add_page()
+        if page % 5 == 4:
+            continue
+        text = ' '.join(rng.choice(words) for _ in range(400))
+        pdf.multi_cell(0, 5, text)
+        if page % 3 == 0 and image_paths:
+            pdf.image(str(image_paths[page % len(image_paths)]), x=10, y=150, w=190)
+    pdf.output(str(path))
+
+
+def build_corpus(root, scale):
+    """Generate every input under root; reuses an existing corpus with the same version and scale."""
+    root = Path(root)
+    marker = root / 'corpus.json'
+    stamp = {'version': CORPUS_VERSION, 'scale': scale}
+    if marker.exists() and json.loads(marker.read_text()) == stamp:
+        return root
+    for folder in CORPUS_FOLDERS:
+        shutil.rmtree(root / folder, ignore_errors=True)
+        (root / folder).mkdir(parents=True)
+
+    for megapixels in IMAGE_MEGAPIXELS:
+        image = synthetic_image(*megapixel_size(megapixels * scale), seed=megapixels)
+        save_jpeg(image, root / 'images' / f'jpeg_{megapixels}mp.jpg', megapixels)
+        image.save(root / 'images' / f'png_{megapixels}mp.png')
+    for index in range(IMAGE_SET_FILES):
+        image = synthetic_image(*megapixel_size(2 * scale), seed=100 + index)
+        if index % 4 == 3:
+            image.save(root / 'image_set' / f'photo_{index:03d}.png')
+        else:
+            save_jpeg(image, root / 'image_set' / f'photo_{index:03d}.jpg', index)
+
+    page_images = sorted((root / 'image_set').glob('*.jpg'))[:4]
+    write_pdf(root / 'pdf' / 'document.pdf', PDF_PAGES, page_images, seed=1)
+    for index in range(PDF_SET_FILES):
+        write_pdf(root / 'pdf_set' / f'part_{index:03d}.pdf', 10, page_images[:1], seed=10 + index)
+
+    for shape, (rows, columns) in EXCEL_SHAPES.items():
+        rows = max(1, int(rows * scale))
+        write_workbook(root / 'excel' / f'{shape}.xlsx', rows, columns, seed=rows)
+        write_csv(root / 'excel' / f'{shape}.csv', rows, columns, seed=rows)
+    for index in range(EXCEL_SET_FILES):
+        rows = max(1, int(EXCEL_SET_ROWS * scale))
+        if index % 2:
+            write_csv(root / 'excel_set' / f'sheet_{index:02d}.csv', rows, 6, seed=index)
+        else:
+            write_workbook(root / 'excel_set' / f'sheet_{index:02d}.xlsx', rows, 6, seed=index)
+
+    marker.write_text(json.dumps(stamp))
+    return root
+
+
+def write_csv(path, rows, columns, seed):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as f:
+        f.write(','.join(f'col_{idx}' for idx in range(columns)) + '\n')
+        for _ in range(rows):
+            f.write(','.join(f'{rng.random() * 1000:.3f}' if col % 3 == 0 else
+                             f'item-{rng.randrange(10000)}' if col % 3 == 1 else
+                             f'2024-01-{rng.randrange(1, 29):02d}' for col in range(columns)) + '\n')
+
+
+def _peak_rss_mb():
+    """
+    Peak RSS of this process or any worker it started, in MB.
+
+    ru_maxrss survives exec, so a spawned child would report the benchmark parent's peak;
+    on Linux the per-address-space VmHWM is read instead.
+    """
+    import resource
+    from Asset.utils import peak_rss_mb
+
+    own = peak_rss_mb()
+    try:
+        with open('/proc/self/status') as f:
+            own = next(int(line.split()[1]) / 1024 for line in f if line.startswith('VmHWM:'))
+    except (OSError, StopIteration):
+        pass
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    workers = workers / (1024 * 1024) if sys.platform == 'darwin' else workers / 1024
+    return max(own or 0, workers)
+
+
+def _run_case(handler, method, input_path, kwargs, output_folder, conn):
+    """Child process body: run one operation and send back (seconds, peak RSS MB, error)."""
+    os.environ['TASKMASTER_PROGRESS'] = 'off'
+    from Asset.cli import handler_class
+
+    func = getattr(handler_class(handler), method)
+    error = None
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        try:
+            func(input_path, output_folder=output_folder, **kwargs)
+        except Exception as e:
+            error = str(e)
+        elapsed = time.perf_counter() - start
+    conn.send((elapsed, _peak_rss_mb(), error))
+    conn.close()
+
+
+def folder_size(path):
+    return sum(p.stat().st_size for p in Path(path).rglob('*') if p.is_file())
+
+
+def run_case(name, corpus, repeat, scale):
+    handler, method, relative_input, kwargs, items, unit = CASES[name]
+    items = max(1, int(items * scale)) if unit == 'rows' else items
+    context = multiprocessing.get_context('spawn')
+    timings, peaks, output_bytes = [], [], 0
+    for _ in range(repeat):
+        output_folder = tempfile.mkdtemp(prefix='bench_out_')
+        try:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_run_case, args=(
+                handler, method, str(Path(corpus) / relative_input), kwargs, output_folder, sender))
+            process.start()
+            sender.close()
+            elapsed, peak, error = receiver.recv()
+            process.join()
+            if error:
+                raise RuntimeError(f"{name} failed: {error}")
+            timings.append(elapsed)
+            peaks.append(peak)
+            output_bytes = folder_size(output_folder)
+        finally:
+            shutil.rmtree(output_folder, ignore_errors=True)
+
+    seconds = statistics.median(timings)
+    return {
+        'seconds': round(seconds, 4),
+        'throughput': round(items / seconds, 2) if seconds else None,
+        'unit': f'{unit}/s',
+        'peak_rss_mb': round(max(peaks), 1),
+        'output_bytes': output_bytes,
+    }
+
+
+def environment(scale, repeat):
+    versions = {}
+    for package in ('pillow', 'pikepdf', 'pandas', 'openpyxl', 'xlsxwriter', 'fpdf2', 'img2pdf',
+                    'python-calamine', 'numpy'):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'scale': scale,
+        'repeat': repeat,
+        'packages': versions,
+    }
+
+
+def compare(results, baseline, threshold, rss_threshold):
+    """Print a comparison table and return the names of regressed cases."""
+    regressions = []
+    print(f"\n{'case':<40} {'baseline':>10} {'current':>10} {'change':>8}   {'rss change':>10}")
+    for name, current in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<40} {'-':>10} {current['seconds']:>9.3f}s {'new':>8}")
+            continue
+        change = current['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+        rss_change = current['peak_rss_mb'] / before['peak_rss_mb'] - 1 if before['peak_rss_mb'] else 0.0
+        regressed = change > threshold or rss_change > rss_threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<40} {before['seconds']:>9.3f}s {current['seconds']:>9.3f}s {change:>+7.0%}   "
+              f"{rss_change:>+9.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', help='Directory for the generated inputs (default: a temporary directory)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply image megapixels and spreadsheet rows (default: 1.0)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the median is kept (default: 3)')
+    parser.add_argument('--cases', nargs='+', metavar='PREFIX',
+                        help='Only run cases whose name starts with one of these prefixes, e.g. pdf image.resize')
+    parser.add_argument('--output', help='Write the results to this JSON file (e.g. a new baseline)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare against a baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown before a case counts as a regression (default: 0.25)')
+    parser.add_argument('--rss-threshold', type=float, default=0.5,
+                        help='Allowed peak RSS growth before a case counts as a regression (default: 0.5)')
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.cases or name.startswith(tuple(args.cases))]
+    with contextlib.ExitStack() as stack:
+        corpus_dir = args.corpus or stack.enter_context(tempfile.TemporaryDirectory(prefix='bench_corpus_'))
+        print(f"Generating corpus in {corpus_dir} ...")
+        corpus = build_corpus(corpus_dir, args.scale)
+
+        results = {}
+        print(f"{'case':<40} {'seconds':>9} {'throughput':>18} {'peak RSS':>10} {'output':>10}")
+        for name in names:
+            result = results[name] = run_case(name, corpus, args.repeat, args.scale)
+            print(f"{name:<40} {result['seconds']:>8.3f}s {result['throughput']:>10.1f} {result['unit']:<7} "
+                  f"{result['peak_rss_mb']:>7.0f} MB {result['output_bytes'] / 1024:>7.0f} KB")
+
+    report = {'environment': environment(args.scale, args.repeat), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['environment'].get('scale') != args.scale:
+            print(f"Warning: baseline was recorded with --scale {baseline['environment'].get('scale')}")
+        regressions = compare(results, baseline, args.threshold, args.rss_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Check TaskMaster's start-up import cost against a budget.
+
+Runs `python -X importtime` on the entry points, reports the cumulative import time and
+fails when a heavy library is imported eagerly or the budget is exceeded:
+
+    python benchmarks/bench_import_time.py --budget-ms 150 --repeat 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+ENTRY_POINTS = ('main', 'Asset.cli')
+
+# Libraries that must only load once an operation that needs them runs
+HEAVY_MODULES = ('pandas', 'pikepdf', 'PIL', 'openpyxl', 'fpdf', 'img2pdf', 'numpy', 'xlsxwriter', 'tqdm')
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+def measure(module):
+    """(cumulative microseconds, {top-level package: cumulative microseconds}) for one fresh import."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=REPO_ROOT, capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    total = None
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        cumulative, name = int(match.group(2)), match.group(4)
+        top = name.split('.')[0]
+        packages[top] = max(packages.get(top, 0), cumulative)
+        if name == module:
+            total = cumulative
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=150.0, help="Maximum median import time per entry point")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument('--modules', nargs='+', default=list(ENTRY_POINTS), help="Entry points to import")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<12} {'median ms':>10} {'min ms':>8}  heavy imports")
+    for module in args.modules:
+        timings = []
+        heavy = set()
+        for _ in range(args.repeat):
+            total, packages = measure(module)
+            timings.append(total / 1000)
+            heavy.update(name for name in HEAVY_MODULES if name in packages)
+
+        median = statistics.median(timings)
+        print(f"{module:<12} {median:>10.1f} {min(timings):>8.1f}  {', '.join(sorted(heavy)) or '-'}")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(sorted(heavy))} at start-up")
+        if median > args.budget_ms:
+            failures.append(f"{module} takes {median:.1f} ms to import (budget {args.budget_ms:.0f} ms)")
+
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
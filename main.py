@@ -1,29 +1,11 @@
 import os
+import sys
 import logging
-import time
-from pathlib import Path
-from tqdm import tqdm
-from Asset.pdf_handler import PDFHandler
-from Asset.image_handler import ImageHandler
-from Asset.excel_tool import ExcelTool
-from Asset.utils import clear_screen, display_logo, list_files_and_select
-
-# Ensure the Output directory exists
-output_dir = Path('Output')
-output_dir.mkdir(parents=True, exist_ok=True)
-
-# Configure logging with absolute path
-log_file_path = output_dir / 'log.log'
-logging.basicConfig(
-    filename=log_file_path,
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
-def show_progress(duration=1):
-    """Show a progress bar for operations."""
-    for _ in tqdm(range(100), desc="Processing", ncols=100):
-        time.sleep(duration/100)
+from Asset.progress import OperationCancelled
+from Asset.utils import clear_screen, configure_logging, display_logo, list_files_and_select
+
+# Ensure the Output directory exists and configure logging
+configure_logging('Output')
 
 def main_menu():
     clear_screen()
@@ -65,6 +47,9 @@ def main_menu():
 
 def pdf_menu():
     """Submenu for PDF operations"""
+    # Imported here so the menu starts without loading every handler's libraries
+    from Asset.pdf_handler import PDFHandler
+
     while True:
         clear_screen()
         print("\n\033[95m=== PDF Tools ===\033[0m")
@@ -80,28 +65,24 @@ def pdf_menu():
             if choice == '1':
                 pdf_path = list_files_and_select('.pdf')
                 if pdf_path:
-                    show_progress(0.5)
                     PDFHandler.split(pdf_path)
                     print("\n\033[92mPDF Split completed successfully!\033[0m")
 
             elif choice == '2':
                 folder_path = list_files_and_select(is_folder=True)
                 if folder_path:
-                    show_progress(0.5)
                     PDFHandler.merge(folder_path)
                     print("\n\033[92mPDF Merge completed successfully!\033[0m")
 
             elif choice == '3':
                 pdf_path = list_files_and_select('.pdf')
                 if pdf_path:
-                    show_progress(0.5)
                     PDFHandler.remove_blank(pdf_path)
                     print("\n\033[92mBlank pages removed successfully!\033[0m")
 
             elif choice == '4':
                 pdf_path = list_files_and_select('.pdf')
                 if pdf_path:
-                    show_progress(0.5)
                     PDFHandler.compress_pdf(pdf_path)
                     print("\n\033[92mPDF compression completed successfully!\033[0m")
 
@@ -110,6 +91,9 @@ def pdf_menu():
 
             input("\nPress Enter to continue...")
 
+        except OperationCancelled:
+            print("\n\033[93mOperation cancelled; partial output was removed.\033[0m")
+            input("\nPress Enter to continue...")
         except Exception as e:
             logging.error(f"Error in PDF menu: {str(e)}")
             print(f"\n\033[91mAn error occurred: {str(e)}\033[0m")
@@ -117,6 +101,8 @@ def pdf_menu():
 
 def image_menu():
     """Submenu for image operations"""
+    from Asset.image_handler import ImageHandler
+
     while True:
         clear_screen()
         print("\n\033[95m=== Image Tools ===\033[0m")
@@ -134,28 +120,24 @@ def image_menu():
             if choice == '1':
                 image_path = list_files_and_select(('.jpg', '.jpeg', '.png'))
                 if image_path:
-                    show_progress(0.3)
                     ImageHandler.extract_data(image_path)
                     print("\n\033[92mImage data extraction completed!\033[0m")
 
             elif choice == '2':
                 image_path = list_files_and_select(('.jpg', '.jpeg', '.png'))
                 if image_path:
-                    show_progress(0.3)
                     ImageHandler.remove_exif_data(image_path)
                     print("\n\033[92mEXIF data removed successfully!\033[0m")
 
             elif choice == '3':
                 image_path = list_files_and_select(('.jpg', '.jpeg', '.png'))
                 if image_path:
-                    show_progress(0.3)
                     ImageHandler.compress_image(image_path)
                     print("\n\033[92mImage compression completed!\033[0m")
 
             elif choice == '4':
                 image_path = list_files_and_select(('.jpg', '.jpeg', '.png'))
                 if image_path:
-                    show_progress(0.3)
                     ImageHandler.convert_format(image_path)
                     print("\n\033[92mImage format conversion completed!\033[0m")
 
@@ -169,7 +151,6 @@ def image_menu():
                     format_choice = input("\n\033[93mEnter the number corresponding to the format: \033[0m").strip()
                     format_map = {"1": "jpeg", "2": "jpg", "3": "png"}
                     if format_choice in format_map:
-                        show_progress(0.5)
                         ImageHandler.batch_convert_format(folder_path, format_map[format_choice])
                         print("\n\033[92mBatch image conversion completed!\033[0m")
                     else:
@@ -181,7 +162,6 @@ def image_menu():
                     output_pdf = input("\n\033[93mEnter the output PDF name (e.g., output.pdf): \033[0m")
                     if not output_pdf.endswith('.pdf'):
                         output_pdf += '.pdf'
-                    show_progress(1.0)
                     ImageHandler.images_to_pdf_with_filenames(folder_path, output_pdf)
                     print("\n\033[92mImages to PDF conversion completed!\033[0m")
 
@@ -190,6 +170,9 @@ def image_menu():
 
             input("\nPress Enter to continue...")
 
+        except OperationCancelled:
+            print("\n\033[93mOperation cancelled; partial output was removed.\033[0m")
+            input("\nPress Enter to continue...")
         except Exception as e:
             logging.error(f"Error in image menu: {str(e)}")
             print(f"\n\033[91mAn error occurred: {str(e)}\033[0m")
@@ -197,6 +180,8 @@ def image_menu():
 
 def excel_menu():
     """Submenu for Excel operations"""
+    from Asset.excel_tool import ExcelTool
+
     while True:
         clear_screen()
         print("\n\033[95m=== Excel Tools ===\033[0m")
@@ -212,7 +197,6 @@ def excel_menu():
             if choice in ['1', '2']:
                 folder_path = list_files_and_select(is_folder=True)
                 if folder_path:
-                    show_progress(0.5)
                     if choice == '1':
                         ExcelTool.merge_workbook(folder_path)
                         print("\n\033[92mWorkbooks merged successfully!\033[0m")
@@ -223,14 +207,12 @@ def excel_menu():
             elif choice == '3':
                 excel_path = list_files_and_select('.xlsx')
                 if excel_path:
-                    show_progress(0.3)
                     ExcelTool.excel_to_csv(excel_path)
                     print("\n\033[92mExcel to CSV conversion completed!\033[0m")
 
             elif choice == '4':
                 csv_path = list_files_and_select('.csv')
                 if csv_path:
-                    show_progress(0.3)
                     ExcelTool.csv_to_excel(csv_path)
                     print("\n\033[92mCSV to Excel conversion completed!\033[0m")
 
@@ -239,6 +221,9 @@ def excel_menu():
 
             input("\nPress Enter to continue...")
 
+        except OperationCancelled:
+            print("\n\033[93mOperation cancelled; partial output was removed.\033[0m")
+            input("\nPress Enter to continue...")
         except Exception as e:
             logging.error(f"Error in Excel menu: {str(e)}")
             print(f"\n\033[91mAn error occurred: {str(e)}\033[0m")
@@ -291,7 +276,6 @@ def file_management_menu():
                 break
 
             input("\nPress Enter to continue...")
-
         except Exception as e:
             logging.error(f"Error in file management: {str(e)}")
             print(f"\n\033[91mAn error occurred: {str(e)}\033[0m")
@@ -312,6 +296,11 @@ def show_about():
     input("\nPress Enter to continue...")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Subcommands run non-interactively, e.g. `python main.py pdf split *.pdf`
+        from Asset.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
     try:
         main_menu()
     except KeyboardInterrupt:
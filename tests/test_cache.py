@@ -0,0 +1,47 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from Asset import cache
+from Asset.cache import cached
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('TASKMASTER_CACHE', '1')
+    monkeypatch.setenv('TASKMASTER_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(cache, '_cache', None)
+    return tmp_path
+
+
+@cached('test.copy')
+def copy_named(input_path, output_folder='Output'):
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    shutil.copy(input_path, Path(output_folder) / f"{Path(input_path).stem}_copy.txt")
+    return True
+
+
+def test_identical_inputs_with_different_names_get_their_own_outputs(cache_dir):
+    first = cache_dir / 'a.txt'
+    second = cache_dir / 'b.txt'
+    first.write_text('same bytes')
+    second.write_text('same bytes')
+    output = cache_dir / 'out'
+
+    copy_named(str(first), output_folder=str(output))
+    copy_named(str(second), output_folder=str(output))
+
+    assert sorted(path.name for path in output.iterdir()) == ['a_copy.txt', 'b_copy.txt']
+    assert cache.get_cache().misses == 2
+
+
+def test_repeated_input_is_served_from_cache(cache_dir):
+    source = cache_dir / 'a.txt'
+    source.write_text('content')
+
+    copy_named(str(source), output_folder=str(cache_dir / 'first'))
+    copy_named(str(source), output_folder=str(cache_dir / 'second'))
+
+    assert (cache_dir / 'second' / 'a_copy.txt').read_text() == 'content'
+    assert cache.get_cache().hits == 1
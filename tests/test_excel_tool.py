@@ -0,0 +1,37 @@
+import openpyxl
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from Asset.excel_tool import ExcelTool, unique_sheet_name
+
+
+def _write_workbook(path, rows):
+    wb = openpyxl.Workbook()
+    for row in rows:
+        wb.active.append(row)
+    wb.save(path)
+
+
+def test_streamed_merge_worksheet_keeps_interior_blank_rows(tmp_path):
+    inputs = tmp_path / 'inputs'
+    inputs.mkdir()
+    _write_workbook(inputs / 'a.xlsx', [['id', 'value'], [1, 2.5], [], [3, 4], [], []])
+    _write_workbook(inputs / 'b.xlsx', [['id', 'value'], [5, 6]])
+
+    ExcelTool.merge_worksheet(str(inputs), str(tmp_path / 'memory'), workers=1)
+    ExcelTool.merge_worksheet(str(inputs), str(tmp_path / 'streamed'), streaming=True)
+
+    in_memory = pd.read_excel(tmp_path / 'memory' / 'merged_worksheet.xlsx')
+    streamed = pd.read_excel(tmp_path / 'streamed' / 'merged_worksheet.xlsx')
+    assert len(in_memory) == 4
+    assert_frame_equal(streamed, in_memory)
+
+
+def test_unique_sheet_name_keeps_truncated_names_apart():
+    used = set()
+    prefix = 'quarterly_report_for_the_region_'
+    names = [unique_sheet_name(f'{prefix}{n}.xlsx', used) for n in (1, 2, 3)]
+    assert len({name.casefold() for name in names}) == 3
+    assert all(len(name) <= 31 for name in names)
+    assert unique_sheet_name('sub/a.csv', used) == 'sub_a.csv'
+    assert unique_sheet_name('SUB/A.csv', used) != 'SUB_A.csv'
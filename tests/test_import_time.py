@@ -0,0 +1,20 @@
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_entry_points_within_import_budget():
+    result = subprocess.run([sys.executable, 'benchmarks/bench_import_time.py', '--repeat', '3'],
+                            cwd=REPO_ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_main_does_not_import_heavy_libraries():
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=REPO_ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    imported = {line.rsplit('|', 1)[-1].strip().split('.')[0]
+                for line in result.stderr.splitlines() if line.startswith('import time:')}
+    assert not imported & {'pandas', 'pikepdf', 'PIL'}
@@ -0,0 +1,29 @@
+import pikepdf
+import pytest
+
+from Asset.pdf_handler import _is_blank_page
+
+
+def _page(content):
+    pdf = pikepdf.new()
+    pdf.add_blank_page()
+    page = pdf.pages[0]
+    page.obj.Contents = pdf.make_stream(content)
+    return pdf, page
+
+
+@pytest.mark.parametrize('content, blank', [
+    (b'', True),
+    (b'1 g 0 0 612 792 re f', True),
+    (b'1 1 1 rg 0 0 612 792 re f 0 0 0 0 k 10 10 50 50 re f', True),
+    (b'BT /F1 12 Tf 3 Tr 72 720 Td (hidden) Tj ET', True),
+    (b'q 1 g 0 0 612 792 re f Q 0 0 612 792 re f', False),
+    (b'0.9 g 0 0 612 792 re f', False),
+    (b'BT /F1 12 Tf 72 720 Td (text) Tj ET', False),
+    (b'q 3 Tr Q BT /F1 12 Tf 72 720 Td (text) Tj ET', False),
+    (b'1 g 0 0 m 100 100 l S', False),
+])
+def test_is_blank_page_ignores_invisible_marks(content, blank):
+    pdf, page = _page(content)
+    with pdf:
+        assert _is_blank_page(page, 0.005, 220) is blank